@@ -3,10 +3,25 @@
 The A* Visualiser for main.py 
 """
 
+import random
 import pygame as pg
-from typing import List, Tuple, Optional, Dict
+from typing import Iterator, List, Tuple, Optional, Dict
 
 from visual_helpers import *
+from display import mouse_pos, present
+from scene_manager import HoldScene, Scene, SceneManager
+from worker import AlgorithmWorker, Event
+
+# Tile expansions per second shown by the visualiser
+ASTAR_RATE = 20
+
+# Color of a walkable tile
+WALKABLE = (105, 105, 105)
+
+# Events published by the search, as (kind, row, col, value):
+# expanding a tile (one step), and a tile's cost changing to <value>
+SELECT = 0
+COST = 1
 
 
 class MazeTile:
@@ -53,8 +68,11 @@ class MazeTile:
             
             
     def switch(self, val=0) -> bool:
-        """ Change whether the tile is an obstacle or not """
+        """ Change whether the tile is an obstacle or not, and return
+        whether that changed it """
+        changed = self.val != val
         self.val = val
+        return changed
     
     
     def draw(self, screen: pg.Surface) -> None:
@@ -69,7 +87,7 @@ class MazeTile:
             color = (135, green, blue)
             pg.draw.rect(screen, color, self.coord) 
         elif self.val == 1:
-            pg.draw.rect(screen, (105, 105, 105), self.coord)
+            pg.draw.rect(screen, WALKABLE, self.coord)
         elif self.val == 0:
             pg.draw.rect(screen, BACKGROUND, self.coord)
     
@@ -137,32 +155,61 @@ class Maze:
             self.tiles.append(rows)
             
             
+    def copy(self) -> 'Maze':
+        """ Return a Maze with the same obstacles and start/end points """
+        maze = Maze()
+        for row, other in zip(self.tiles, maze.tiles):
+            for tile, copy in zip(row, other):
+                copy.val = tile.val
+        if self.start is not None:
+            maze.start = maze.tiles[self.start.pos[0]][self.start.pos[1]]
+        if self.end is not None:
+            maze.end = maze.tiles[self.end.pos[0]][self.end.pos[1]]
+        return maze
+            
+            
     def draw(self, screen: pg.Surface) -> None:
-        """ Draws the Maze """
-        clear_screen(screen)
+        """ Draws the Maze. Plain walkable tiles come from the 
+        pre-rendered grid, only the others are drawn """
+        screen.blit(get_layer(("maze",), self._draw_grid), (0, 0))
         for row in self.tiles:
             for tile in row:
-                if tile == self.start:
+                if tile is self.start:
                     pg.draw.rect(screen, HIGHLIGHT1, tile.coord)
-                elif tile == self.end:
+                elif tile is self.end:
                     pg.draw.rect(screen, HIGHLIGHT2, tile.coord)
-                elif tile == self.selected:
+                elif tile is self.selected:
                     pg.draw.rect(screen, HIGHLIGHT2, tile.coord)
+                elif tile.cost == 0 and tile.val == 1:
+                    continue
                 else:
                     tile.draw(screen)
                 pg.draw.rect(screen, BACKGROUND, tile.coord, 2)
-        pg.display.flip()
+        present()
+        
+        
+    def _draw_grid(self, screen: pg.Surface) -> None:
+        """ Draws every tile as a plain walkable tile with its
+        outline, the static layer under the Maze """
+        clear_screen(screen)
+        for row in self.tiles:
+            for tile in row:
+                pg.draw.rect(screen, WALKABLE, tile.coord)
+                pg.draw.rect(screen, BACKGROUND, tile.coord, 2)
         
         
-    def set_tile_state(self, x: int, y: int, mode: int) -> None: 
-        """ Switches the Orientation of the tile at <x, y> """
+    def set_tile_state(self, x: int, y: int, mode: int) -> bool: 
+        """ Switches the Orientation of the tile at <x, y>, and return
+        whether any tile changed """
+        changed = False
         for rows in self.tiles:
             for tile in rows:
                 if tile.is_cursor_on(x, y):
                     if mode == 1:  
-                        tile.switch(0)
+                        changed |= tile.switch(0)
                     elif mode == 2:
-                        tile.switch(1)
+                        changed |= tile.switch(1)
+        return changed
     
     
     def start_end(self, x: int, y: int, mode: int, end=False) -> None:
@@ -206,23 +253,15 @@ class Maze:
         return children
     
     
-    def solve_astar(self, screen: pg.Surface) -> List[MazeTile]:
-        """ Finds the shortest path from start to end """
-        
-        if self.end is None or self.start is None:
-            return self.invalid(screen, "Invalid Start/End Points")
+    def astar_steps(self) -> Iterator[Event]:
+        """ Run A* from start to end, yielding every change as
+        an event. Returns the last expanded tile """
             
         open_lst, closed_lst = [self.start], []
         
         current_tile = None
         while open_lst != [] and current_tile != self.end:
             
-            # Event loop to stop it from freezing
-            for e in pg.event.get():
-                if e.type == pg.QUIT:
-                    pg.quit()
-                    exit()
-            
             # Finding node with the least cost in open
             current_tile = open_lst[0]
             current_i = 0
@@ -234,8 +273,7 @@ class Maze:
             closed_lst.append(open_lst.pop(current_i))
             
             self.selected = current_tile
-            self.draw(screen)
-            pg.time.delay(50)
+            yield (SELECT, current_tile.pos[0], current_tile.pos[1], 0)
                 
             # Getting all the valid adjacent children
             children = self.get_children(current_tile)
@@ -258,6 +296,7 @@ class Maze:
                     child.parent = current_tile
                     child.dist, child.heur, child.cost = dist, heur, cost
                     open_lst.append(child)
+                    yield (COST, child.pos[0], child.pos[1], cost)
                 
                 # Else if its in open_lst, update if cost is lower
                 else:
@@ -267,24 +306,25 @@ class Maze:
                             open_n.cost = cost
                             open_n.heur = heur
                             open_n.dist = dist
-                    
-            pg.display.flip()
+                            yield (COST, open_n.pos[0], open_n.pos[1], cost)
         
-        # Hit destination
-        if current_tile == self.end:
-            return self.finish(screen, current_tile)
-        # Else ran out of possiblities
-        return self.invalid(screen, "Invalid Obstacles")
+        return current_tile
+    
+    
+    def apply(self, event: Event) -> None:
+        """ Make the change <event> published by astar_steps() """
+        kind, row, col, val = event
+        if kind == SELECT:
+            self.selected = self.tiles[row][col]
+        else:
+            self.tiles[row][col].cost = val
          
          
     def invalid(self, screen: pg.Surface, text: str) -> None:
         """ Draws the screen when given an invalid input """
-        clear_screen(screen)
-        border(screen) 
+        draw_chrome(screen)
         write_text(screen, "Impossible!", get_font(72), TEXT, (50, 210))
         pg.draw.rect(screen, TEXT, (50, 310, 540, 10))
-        time_loop(screen, 5000)
-        return [-1]
         
         
     def finish(self, screen: pg.Surface, current_tile: MazeTile) -> List[MazeTile]:
@@ -297,19 +337,162 @@ class Maze:
             current_tile = current_tile.parent
 
         # Drawing the final path with obstacles
-        clear_screen(screen)          
+        screen.blit(get_layer(("maze",), self._draw_grid), (0, 0))
         for rows in self.tiles:
             for tile in rows:
-                if tile in path:
-                    pg.draw.rect(screen, HIGHLIGHT2, tile.coord)
-                elif tile.val == 1:
-                    pg.draw.rect(screen, (105, 105, 105), tile.coord)
-                elif tile.val == 0:
+                if tile.val == 0:
                     pg.draw.rect(screen, BACKGROUND, tile.coord)
-                pg.draw.rect(screen, BACKGROUND, tile.coord, 2)
-        
-        pg.display.flip()
-        time_loop(screen, 10000)
+        for tile in path:
+            pg.draw.rect(screen, HIGHLIGHT2, tile.coord)
+            pg.draw.rect(screen, BACKGROUND, tile.coord, 2)
         
         return path
- 
\ No newline at end of file
+
+
+def sample_maze(seed: int, density=0.3) -> Maze:
+    """ Return a Maze going from corner to corner, with about <density>
+    of its tiles made obstacles at random (from <seed>) """
+    rng = random.Random(seed)
+    maze = Maze()
+    for row in maze.tiles:
+        for tile in row:
+            if rng.random() < density:
+                tile.switch(0)
+
+    maze.start, maze.end = maze.tiles[0][0], maze.tiles[39][39]
+    maze.start.switch(1)
+    maze.end.switch(1)
+    return maze
+
+
+class AStarScene(Scene):
+    """ Render the astar simulation program. Obstacles and
+    start/end points are set first, then space starts the search.
+    Clicking pauses/resumes the search
+
+    ==== Public Attributes ====
+    board: The Maze shown, following the search's steps
+    mode: 0 is for selecting start, end pts
+          1 is for creating obstacles
+          2 is for clearing obstacles
+
+    ==== Private Attributes ====
+    _worker: Runs the A* search on a copy of the maze, None while
+             still editing
+    _changed: Whether the board changed since it was last drawn
+    """
+
+    board: Maze
+    mode: int
+    _worker: Optional[AlgorithmWorker]
+    _changed: bool
+    rate = ASTAR_RATE
+
+    def __init__(self, manager: SceneManager) -> None:
+        super().__init__(manager)
+        self.board = Maze()
+        self.mode = 0
+        self._worker = None
+        self._changed = False
+
+    def enter(self) -> None:
+        self.board.draw(self.screen)
+
+    def handle(self, e: pg.event.Event) -> None:
+        if self._worker is not None:
+            if e.type == pg.MOUSEBUTTONUP:
+                self.scheduler.paused = not self.scheduler.paused
+                self.blocking = self.scheduler.paused
+                self.scheduler.reset()
+            return
+
+        # If a key is pressed
+        if e.type == pg.KEYUP:
+            
+            # Left Shift for adding obstacles
+            if e.key == pg.K_LSHIFT:
+                if self.mode != 1:
+                    self.mode = 1
+                else:
+                    self.mode = 0
+            
+            # Capslock for clearing obstacles
+            if e.key == pg.K_CAPSLOCK:
+                if self.mode != 2:
+                    self.mode = 2
+                else:
+                    self.mode = 0
+            
+            # Space to start simulation
+            if e.key == pg.K_SPACE:
+                self.solve()
+        
+        # If clicked with mouse
+        if e.type == pg.MOUSEBUTTONDOWN and self.mode == 0:
+            x, y = e.pos
+            if e.button == 1:
+                self.board.start_end(x, y, self.mode)
+                self._changed = True
+            
+            elif e.button == 3:
+                self.board.start_end(x, y, self.mode, True)
+                self._changed = True
+
+    def update(self, steps: int) -> None:
+        # Still editing the maze
+        if self._worker is None:
+            # Only drawn (and scaled to the window) again if it changed
+            x, y = mouse_pos()
+            if self.board.set_tile_state(x, y, self.mode):
+                self._changed = True
+            return
+
+        for step in self._worker.take(steps):
+            for event in step:
+                self.board.apply(event)
+            self._changed = True
+
+        if self._worker.done:
+            self._finish(self._worker.result)
+
+    def draw(self) -> None:
+        if self._changed:
+            self.board.draw(self.screen)
+            self._changed = False
+
+    def autoplay(self, seed: int) -> None:
+        self.board = sample_maze(seed)
+        self.solve()
+        # Every frame shows the same steps, however fast the worker runs
+        if self._worker is not None:
+            self._worker.wait = True
+
+    def solve(self) -> None:
+        """ Start the search, if there are start and end points """
+        board = self.board
+        if board.end is None or board.start is None:
+            self.manager.replace(HoldScene(self.manager, 5000, 
+                lambda screen: board.invalid(screen, "Invalid Start/End Points")))
+            return
+
+        self._worker = AlgorithmWorker(board.copy().astar_steps(), SELECT)
+        self.blocking = False
+        self.scheduler.reset()
+
+    def close(self) -> None:
+        if self._worker is not None:
+            self._worker.stop()
+
+    def _finish(self, current_tile: MazeTile) -> None:
+        """ Show the result of the search ending on <current_tile>
+        (a tile of the searched copy, which has the same layout) """
+        board = self.board
+
+        # Hit destination
+        if current_tile == board.end:
+            self.manager.replace(HoldScene(self.manager, 10000,
+                lambda screen: board.finish(screen, current_tile)))
+        # Else ran out of possiblities
+        else:
+            self.manager.replace(HoldScene(self.manager, 5000,
+                lambda screen: board.invalid(screen, "Invalid Obstacles")))
@@ -0,0 +1,9 @@
+"""
+The searching visualisers offered by Algrow. Nothing is imported from
+here, the scenes are only loaded once picked.
+"""
+
+from registry import SEARCHING
+
+SEARCHING.declare("BackTracking", "Searching.sudoku_visual", "SudokuScene")
+SEARCHING.declare("A*", "Searching.astar_visual", "AStarScene")
@@ -4,14 +4,28 @@ The Sudoku Backtracking Visaliser for main.py (Algrow)
 
 
 import pygame as pg
-from typing import List, Tuple
+from typing import Iterator, List, Tuple
 
 from visual_helpers import *
+from display import present
+from scene_manager import HoldScene, Scene, SceneManager
+from worker import AlgorithmWorker, Event
 
 # Colors 
 SAFE = HIGHLIGHT1
 SELECT = HIGHLIGHT2
 
+# Guesses per second shown by the visualiser
+SOLVE_RATE = 20
+
+# Size of the digits written on the tiles
+DIGIT_SIZE = 60
+
+# Events published by the solver, as (kind, row, col, value):
+# guessing <value> at a tile (one step), and setting a tile's value
+GUESS = 0
+SET = 1
+
 
 def get_grid() -> List[List[int]]:
     """ Retuns the Grid that the SudokuBoard
@@ -81,11 +95,11 @@ class SudokuTile:
         
         pos = self.rect[0] + (20), self.rect[1] + 2
         if self.val != 0 and self.known:
-            write_text(screen, str(self.val), get_font(60), TEXT, pos)
+            write_text(screen, str(self.val), get_font(DIGIT_SIZE), TEXT, pos)
         elif self.val != 0 and not self.known:
-            write_text(screen, str(self.val), get_font(60), HIGHLIGHT1, pos)
+            write_text(screen, str(self.val), get_font(DIGIT_SIZE), HIGHLIGHT1, pos)
         elif self.guess != 0 and self.selected:
-            write_text(screen, str(self.guess), get_font(60), HIGHLIGHT2, pos)        
+            write_text(screen, str(self.guess), get_font(DIGIT_SIZE), HIGHLIGHT2, pos)        
             
     
     def _draw_border(self, screen: pg.Surface, color: Tuple[int], thick=2) -> None:
@@ -101,7 +115,7 @@ class SudokuTile:
         complete """
         pos = self.rect[0] + (20), self.rect[1] + 2
         pg.draw.rect(screen, TEXT, self.rect, 1)
-        write_text(screen, str(self.val), get_font(60), TEXT, pos)
+        write_text(screen, str(self.val), get_font(DIGIT_SIZE), TEXT, pos)
    
     
 class SudokuBoard:
@@ -130,18 +144,38 @@ class SudokuBoard:
                 coords = (x + (col * delta_x), y + (row * delta_y), delta_x, delta_y)
                 rows.append(SudokuTile(coords, grid[row][col]))
             self.tiles.append(rows)
+        
+        # Digit atlas so drawing a tile never renders text
+        bake_text([str(i) for i in range(1, 10)], get_font(DIGIT_SIZE),
+                  [TEXT, HIGHLIGHT1, HIGHLIGHT2])
 
 
     def draw(self, screen) -> None:
-        """ Draws the SudokuBoard on <screen> """
-        clear_screen(screen)
-        self._fill_edges(screen)
+        """ Draws the SudokuBoard on <screen>. Only the tiles being
+        solved are drawn over the pre-rendered board """
+        layer = get_layer(("sudoku",) + tuple(map(tuple, grid)), 
+                          self._draw_static)
+        screen.blit(layer, (0, 0))
         for row in self.tiles:
             for tile in row:
+                if tile.known or (tile.val == 0 and not tile.selected):
+                    continue
                 tile.draw(screen)
                 
         
-        pg.display.flip()
+        present()
+        
+        
+    def _draw_static(self, screen) -> None:
+        """ Draws what doesn't change while solving: the edges,
+        every tile's outline and the known values """
+        clear_screen(screen)
+        self._fill_edges(screen)
+        for row in self.tiles:
+            for tile in row:
+                pg.draw.rect(screen, TEXT, tile.rect, 1)
+                if tile.known:
+                    tile.draw(screen)
                 
                 
     def _fill_edges(self, screen) -> None:
@@ -220,9 +254,10 @@ class SudokuBoard:
         tile.guess = val
                     
         
-    def solve(self, screen) -> bool: 
+    def solve(self) -> Iterator[Event]: 
         """ Solve the SudokuBoard using the BackTracking
-        Algorithm """        
+        Algorithm, yielding every change as an event.
+        Returns whether the board was solved """        
         row, col = self.find_empty()
         
         if row == -1 or col == -1:
@@ -232,28 +267,29 @@ class SudokuBoard:
             
             self.select(row, col)
             self.guess(row, col, guess)
-            self.draw(screen)
-
-            # So the user can leave midway
-            for e in pg.event.get():            
-                if e.type == pg.QUIT:
-                    pg.quit()
-                    exit()
+            yield (GUESS, row, col, guess)
             
             if self.is_safe(row, col, guess):
                 self.set_tile(row, col, guess)
-                self.draw(screen)
+                yield (SET, row, col, guess)
                 
-                if self.solve(screen):
+                if (yield from self.solve()):
                     return True
                 
                 self.set_tile(row, col, 0)
-                self.draw(screen)
-                
-            pg.time.delay(50)
-            pg.display.flip()
+                yield (SET, row, col, 0)
                   
         return False
+    
+    
+    def apply(self, event: Event) -> None:
+        """ Make the change <event> published by solve() """
+        kind, row, col, val = event
+        if kind == GUESS:
+            self.select(row, col)
+            self.guess(row, col, val)
+        else:
+            self.set_tile(row, col, val)
 
 
     def finished(self, screen) -> None:
@@ -265,9 +301,65 @@ class SudokuBoard:
                 tile.finish(screen)
                 
         self._fill_edges(screen)
-        pg.display.flip()
+        present()
         
         
+class SudokuScene(Scene):
+    """ Solve sudoku using backtracking algorithm and display
+    it on GUI. Clicking pauses/resumes it
+
+    ==== Public Attributes ====
+    board: The SudokuBoard shown, following the solver's steps
+
+    ==== Private Attributes ====
+    _worker: Runs the backtracking algorithm on its own board
+    _changed: Whether the board changed since it was last drawn
+    """
+
+    board: SudokuBoard
+    _worker: AlgorithmWorker
+    _changed: bool
+    rate = SOLVE_RATE
+
+    def __init__(self, manager: SceneManager) -> None:
+        super().__init__(manager)
+        self.board = SudokuBoard()
+        self._worker = AlgorithmWorker(SudokuBoard().solve(), GUESS)
+        self._changed = False
+        self.blocking = False
+
+    def enter(self) -> None:
+        self.board.draw(self.screen)
+
+    def handle(self, event: pg.event.Event) -> None:
+        if event.type == pg.MOUSEBUTTONUP:
+            self.scheduler.paused = not self.scheduler.paused
+            self.blocking = self.scheduler.paused
+            self.scheduler.reset()
+
+    def update(self, steps: int) -> None:
+        for step in self._worker.take(steps):
+            for event in step:
+                self.board.apply(event)
+            self._changed = True
+
+        if self._worker.done:
+            self.manager.replace(HoldScene(self.manager, 8000,
+                                           self.board.finished))
+
+    def autoplay(self, seed: int) -> None:
+        # Every frame shows the same steps, however fast the worker runs
+        self._worker.wait = True
+
+    def close(self) -> None:
+        self._worker.stop()
+
+    def draw(self) -> None:
+        if self._changed:
+            self.board.draw(self.screen)
+            self._changed = False
+
+
 if __name__ == '__main__':
     pass
                 
\ No newline at end of file
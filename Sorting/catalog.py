@@ -0,0 +1,38 @@
+"""
+The sorting visualisers offered by Algrow. Nothing is imported from
+here, the steppers are only loaded once picked.
+"""
+
+from importlib.util import find_spec
+
+from registry import SORTING
+
+SORTING.declare("Bubble Sort", "Sorting.sort_functions", "BubbleSteps")
+SORTING.declare("Insertion Sort", "Sorting.sort_functions", "InsertionSteps")
+SORTING.declare("Selection Sort", "Sorting.sort_functions", "SelectionSteps")
+SORTING.declare("Merge Sort", "Sorting.sort_functions", "MergeSteps")
+SORTING.declare("Bottom-Up Merge", "Sorting.sort_functions",
+                "BottomUpMergeSteps")
+SORTING.declare("Lomuto Quick", "Sorting.sort_functions", "QuickSteps")
+SORTING.declare("Hoare Quick", "Sorting.sort_functions", "HoareQuickSteps")
+SORTING.declare("Median-3 Quick", "Sorting.sort_functions",
+                "MedianQuickSteps")
+SORTING.declare("Heap Sort", "Sorting.sort_functions", "HeapSteps")
+SORTING.declare("Timsort", "Sorting.sort_functions", "TimSteps")
+SORTING.declare("Introsort", "Sorting.sort_functions", "IntroSteps")
+SORTING.declare("Pdqsort", "Sorting.sort_functions", "PdqSteps")
+
+# Only with numpy, which runs their passes
+if find_spec("numpy") is not None:
+    SORTING.declare("Counting Sort", "Sorting.vector_functions",
+                    "CountingSteps")
+    SORTING.declare("LSD Radix", "Sorting.vector_functions", "LsdRadixSteps")
+    SORTING.declare("MSD Radix", "Sorting.vector_functions", "MsdRadixSteps")
+    SORTING.declare("Bucket Sort", "Sorting.vector_functions", "BucketSteps")
+    SORTING.declare("Bitonic Sort", "Sorting.vector_functions",
+                    "BitonicSteps")
+    SORTING.declare("Odd-Even Merge", "Sorting.vector_functions",
+                    "OddEvenMergeSteps")
+    SORTING.declare("Transposition", "Sorting.vector_functions",
+                    "TranspositionSteps")
+    SORTING.declare("External Merge", "Sorting.external", "ExternalSteps")
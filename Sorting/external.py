@@ -0,0 +1,381 @@
+"""
+External merge sort: sorting a file of binary integers (little-endian
+int32) that may not fit in memory.
+
+The file is read through numpy.memmap a chunk at a time; every chunk is
+sorted in memory and written out as a sorted run. The runs are then
+merged, at most FAN_IN at a time, each through a buffer of the memory
+allowed: a heap keyed by the last item buffered from every run tells
+which buffer runs out first, and everything no larger than that item,
+from every buffer, is merged and written in one go. Merge passes go
+back and forth between the target and a temporary file, arranged so
+the last one writes the target. The comparisons counted are the heap's;
+those numpy makes sorting and merging the buffers are its own.
+
+ExternalSteps plays an external sort in the sorting visualiser, showing
+a down-sampled view of the data as the runs are formed and merged.
+
+    $ python -m Sorting.external make data.bin --items 100000000
+    $ python -m Sorting.external sort data.bin sorted.bin --memory 8000000
+    $ python -m Sorting.external show data.bin --memory 1000000
+"""
+
+import heapq
+import os
+import shutil
+import tempfile
+import weakref
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from Sorting.sort_functions import BLOCK, COUNT, CYCLE, Step
+from Sorting.vector_functions import VectorSteps
+
+# The items in the files
+DTYPE = np.dtype("<i4")
+
+# Items held in memory at once, unless told otherwise
+MEMORY = 1 << 22
+
+# Most runs merged at once
+FAN_IN = 16
+
+# Items of the data shown at most, spread evenly over it
+VIEW_ITEMS = 1024
+
+# Runs the visualiser's own items are split into
+DEMO_RUNS = 6
+
+
+class ExternalSort:
+    """
+    Sorts the binary integers in one file into another, holding about
+    <memory> of them in memory at a time
+
+    ==== Public Attributes ====
+    source: The file to sort, left untouched
+    target: The file written with the items sorted
+    memory: The number of items held in memory at a time
+    size: The number of items in <source>
+
+    ==== Private Attributes ====
+    _scratch: The temporary file merge passes alternate with <target>
+    """
+
+    source: str
+    target: str
+    memory: int
+    size: int
+    _scratch: str
+
+    def __init__(self, source: str, target: str, memory=MEMORY) -> None:
+        """ Initializes an ExternalSort of <source> into <target> """
+        if os.path.abspath(source) == os.path.abspath(target):
+            raise ValueError("can't sort " + source + " into itself")
+        self.source = source
+        self.target = target
+        self.memory = max(2, memory)
+        self.size = os.path.getsize(source) // DTYPE.itemsize
+        self._scratch = target + ".runs"
+
+    def sort(self) -> None:
+        """ Sort <source> into <target> """
+        for _ in self.passes():
+            pass
+
+    def passes(self) -> Iterator[Tuple[int, np.ndarray, int, int, int]]:
+        """ Sort <source> into <target>, yielding what was done after
+        every run formed and every round of a merge: the number of the
+        pass over the data, the file written, the range of items of it
+        written and the comparisons of the merge's heap. Items not yet
+        written in a pass are where the pass before left them """
+        n = self.size
+        # Runs, then merge passes each cutting their number by FAN_IN
+        runs = [(lo, min(lo + self.memory, n))
+                for lo in range(0, n, self.memory)]
+        merges = 0
+        count = len(runs)
+        while count > 1:
+            count = -(-count // FAN_IN)
+            merges += 1
+
+        files = [self.target, self._scratch]
+        if merges % 2:
+            files.reverse()
+        _create(self.target, n)
+        if not n:
+            return
+        if merges:
+            _create(self._scratch, n)
+        try:
+            source = np.memmap(self.source, DTYPE, "r", shape=(n,))
+            dest = np.memmap(files[0], DTYPE, "r+", shape=(n,))
+            for lo, hi in runs:
+                dest[lo:hi] = np.sort(source[lo:hi])
+                yield 1, dest, lo, hi, 0
+            dest.flush()
+            del source
+
+            for cycle in range(2, merges + 2):
+                source = dest
+                dest = np.memmap(files[(cycle - 1) % 2], DTYPE, "r+",
+                                 shape=(n,))
+                merged = []
+                for k in range(0, len(runs), FAN_IN):
+                    group = runs[k:k + FAN_IN]
+                    for lo, hi, compared in _merge(source, dest, group,
+                                                   self.memory):
+                        yield cycle, dest, lo, hi, compared
+                    merged.append((group[0][0], group[-1][1]))
+                runs = merged
+                dest.flush()
+                del source
+            del dest
+        finally:
+            if os.path.exists(self._scratch):
+                os.remove(self._scratch)
+
+    def sample(self, positions: np.ndarray) -> np.ndarray:
+        """ Return the items of <source> at <positions> """
+        if not self.size:
+            return np.zeros(0, DTYPE)
+        source = np.memmap(self.source, DTYPE, "r", shape=(self.size,))
+        return source[positions]
+
+    def bounds(self) -> Tuple[int, int]:
+        """ Return the smallest and largest item of <source>, read a
+        chunk at a time """
+        if not self.size:
+            return 0, 0
+        source = np.memmap(self.source, DTYPE, "r", shape=(self.size,))
+        low, high = int(source[0]), int(source[0])
+        for lo in range(0, self.size, self.memory):
+            chunk = source[lo:lo + self.memory]
+            low = min(low, int(chunk.min()))
+            high = max(high, int(chunk.max()))
+        return low, high
+
+
+def _create(path: str, n: int) -> None:
+    """ Create the file <path> big enough for <n> items """
+    with open(path, "wb") as f:
+        f.truncate(n * DTYPE.itemsize)
+
+
+class _Bound:
+    """
+    An entry of a merge's heap: the last item buffered from a run.
+    Entries count the comparisons made between them
+
+    ==== Public Attributes ====
+    item: The last item buffered from the run
+    run: The index of the run
+    compared: The number of comparisons made between the entries of
+              the heap, shared by all of them
+    """
+
+    item: int
+    run: int
+    compared: List[int]
+
+    def __init__(self, item: int, run: int, compared: List[int]) -> None:
+        """ Initializes a _Bound of <run>, counting into <compared> """
+        self.item = item
+        self.run = run
+        self.compared = compared
+
+    def __lt__(self, other: '_Bound') -> bool:
+        self.compared[0] += 1
+        return (self.item, self.run) < (other.item, other.run)
+
+
+def _merge(source: np.ndarray, dest: np.ndarray, runs: List[Tuple[int, int]],
+           memory: int) -> Iterator[Tuple[int, int, int]]:
+    """ Merge the sorted <runs> of <source> into the same stretch of
+    <dest>, through buffers sharing <memory> items. Yield the range of
+    <dest> written after every round, and the comparisons the heap made
+    since the round before """
+    size = max(1, memory // (len(runs) + 1))
+    # The items buffered from every run, and where the rest of it starts
+    buffers = [np.array(source[lo:min(lo + size, hi)]) for lo, hi in runs]
+    starts = [min(lo + size, hi) for lo, hi in runs]
+    # The last item buffered from every run with items left: the run
+    # on top is the one whose buffer runs out first
+    compared = [0]
+    heap = [_Bound(int(buffer[-1]), k, compared)
+            for k, buffer in enumerate(buffers) if len(buffer)]
+    heapq.heapify(heap)
+
+    at = runs[0][0]
+    # The range written by the last round, given out with the
+    # comparisons made up to the next, so none are left after it
+    written = None
+    while heap:
+        top = heapq.heappop(heap)
+        bound, k = top.item, top.run
+        # Nothing left in any run is smaller than what is buffered up
+        # to <bound>, so all of it can be written
+        parts = []
+        for j, buffer in enumerate(buffers):
+            cut = len(buffer) if j == k else \
+                int(np.searchsorted(buffer, bound, "right"))
+            if cut:
+                parts.append(buffer[:cut])
+                buffers[j] = buffer[cut:]
+        # A buffer emptied by another's round has nothing left to write
+        if parts:
+            merged = np.sort(np.concatenate(parts), kind="stable")
+            if written is not None:
+                yield written + (compared[0],)
+                compared[0] = 0
+            dest[at:at + len(merged)] = merged
+            written = (at, at + len(merged))
+            at += len(merged)
+
+        hi = runs[k][1]
+        buffers[k] = np.array(source[starts[k]:min(starts[k] + size, hi)])
+        starts[k] = min(starts[k] + size, hi)
+        if len(buffers[k]):
+            heapq.heappush(heap, _Bound(int(buffers[k][-1]), k, compared))
+    if written is not None:
+        yield written + (compared[0],)
+
+
+class ExternalSteps(VectorSteps):
+    """
+    An external merge sort played in the sorting visualiser. Its items
+    are a view of the data, at most VIEW_ITEMS of them taken evenly
+    across it: where a pass has written, from the file it writes, and
+    elsewhere from where the pass before left them. Every run formed
+    and every round of a merge is a step. The cycle is the number of
+    passes over the data, and the writes are the items written to the
+    files, not to the view
+
+    ==== Public Attributes ====
+    sort: The external sort being played
+
+    ==== Private Attributes ====
+    _positions: The index in the data of every item of the view
+    _bounds: The smallest and largest item of the data
+    _temporary: Removes the directory of the files sorted, if they're
+                only there for this (once sorted, or once this is
+                dropped, whichever comes first), None otherwise
+    """
+
+    sort: ExternalSort
+    _positions: np.ndarray
+    _bounds: Tuple[int, int]
+    _temporary: Optional[weakref.finalize]
+
+    def __init__(self, data: List[int],
+                 sort: Optional[ExternalSort] = None) -> None:
+        """ Initializes an ExternalSteps playing <sort>, or sorting
+        <data> through temporary files in runs of a sixth of it """
+        self._temporary = None
+        if sort is None:
+            directory = tempfile.mkdtemp(prefix="algrow-")
+            # Even if sorting never starts
+            self._temporary = weakref.finalize(self, shutil.rmtree,
+                                               directory, True)
+            source = os.path.join(directory, "items.bin")
+            np.array(data, DTYPE).tofile(source)
+            sort = ExternalSort(source, os.path.join(directory, "sorted.bin"),
+                                -(-len(data) // DEMO_RUNS))
+        self.sort = sort
+        n = sort.size
+        self._positions = np.unique(
+            np.linspace(0, n - 1, min(n, VIEW_ITEMS)).astype(np.int64))
+        self._bounds = sort.bounds()
+        super().__init__(sort.sample(self._positions).tolist())
+
+    def _passes(self, items: np.ndarray) -> Iterator[Step]:
+        try:
+            for cycle, written, lo, hi, compared in self.sort.passes():
+                start, stop = np.searchsorted(self._positions, (lo, hi))
+                if start == stop:
+                    yield COUNT, compared, hi - lo, CYCLE, cycle, 0
+                    continue
+                items[start:stop] = written[self._positions[start:stop]]
+                yield BLOCK, int(start), int(stop), COUNT, compared, \
+                    hi - lo, CYCLE, cycle, 0
+        finally:
+            if self._temporary is not None:
+                self._temporary()
+
+    def bounds(self) -> Tuple[int, int]:
+        return self._bounds
+
+    def complete(self) -> bool:
+        # The view can be in order long before the data is
+        return self._finished
+
+    def get_title(self) -> str:
+        return "External Merge"
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Sort files of binary "
+                                     "int32 larger than memory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    make = commands.add_parser("make", help="write a file of random items")
+    make.add_argument("path")
+    make.add_argument("--items", type=int, default=1 << 24)
+    make.add_argument("--seed", type=int, default=0)
+    run = commands.add_parser("sort", help="sort a file and time it")
+    run.add_argument("source")
+    run.add_argument("target")
+    run.add_argument("--memory", type=int, default=MEMORY,
+                     help="items held in memory at a time")
+    show = commands.add_parser("show", help="watch a file being sorted")
+    show.add_argument("source")
+    show.add_argument("--target", help="defaults to SOURCE.sorted")
+    show.add_argument("--memory", type=int, default=MEMORY)
+    check = commands.add_parser("check", help="check a file is sorted")
+    check.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "make":
+        rng = np.random.default_rng(args.seed)
+        with open(args.path, "wb") as f:
+            for lo in range(0, args.items, MEMORY):
+                rng.integers(0, 1 << 31, min(MEMORY, args.items - lo),
+                             DTYPE).tofile(f)
+    elif args.command == "sort":
+        external = ExternalSort(args.source, args.target, args.memory)
+        start = time.perf_counter()
+        external.sort()
+        elapsed = time.perf_counter() - start
+        print("Sorted %d items in %.2f s (%.1f MB/s)"
+              % (external.size, elapsed,
+                 external.size * DTYPE.itemsize / 1e6 / max(elapsed, 1e-9)))
+    elif args.command == "check":
+        size = os.path.getsize(args.path) // DTYPE.itemsize
+        data = np.memmap(args.path, DTYPE, "r", shape=(size,)) if size \
+            else np.zeros(0, DTYPE)
+        # Chunks overlap by one, so every neighbouring pair is checked
+        unsorted = sum(int(np.count_nonzero(
+            data[lo:lo + MEMORY + 1][:-1] > data[lo:lo + MEMORY + 1][1:]))
+            for lo in range(0, size, MEMORY))
+        print("%d items, %d pairs out of order" % (size, unsorted))
+        if unsorted:
+            exit(1)
+    else:
+        import pygame as pg
+        from visual_helpers import HEIGHT, WIDTH
+        from display import Display
+        from scene_manager import SceneManager
+        from Sorting.sort_visual import SortScene
+
+        external = ExternalSort(args.source, args.target or
+                                args.source + ".sorted", args.memory)
+        pg.init()
+        pg.display.set_caption('Algrow')
+        display = Display((WIDTH, HEIGHT))
+        manager = SceneManager(display.surface)
+        manager.push(SortScene(manager, ExternalSteps([], external)))
+        manager.run()
+        pg.quit()
@@ -1,188 +1,1232 @@
 """
 Implementing sorting classes for the sorting visualiser in main.py,
 currently implemented:
-QuickSort, InsertionSort, BubbleSort
+BubbleSort, InsertionSort, SelectionSort, MergeSort (top-down and
+bottom-up), QuickSort (Lomuto, Hoare and median-of-three), HeapSort,
+Timsort, Introsort and Pdqsort
+
+Every algorithm is a plain generator, _sort(), reading the items shown
+and yielding each step as the operations that sort them: a flat tuple
+of (operation, a, b) triples. SortSteps applies the operations to the
+items before the generator goes on, so the algorithms keep no copy of
+the items, hold no drawing state and steps can be pulled in bulk,
+recorded or replayed as they are. Counting the
+operations as they are applied gives every algorithm exact counts of
+its comparisons, swaps (or moves) and writes.
 """
 
-from typing import List, Tuple, Dict
+from typing import Iterator, List, Optional, Set, Tuple, Dict
+import operator
 import random
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 from visual_helpers import *
 
+# Operations of a step: comparing (highlighting) two indices, swapping
+# them, moving an item from one index to another, writing a value
+# (second) at an index, setting the cycle count (first), and taking a
+# whole block of items, from the first index up to the second, from the
+# algorithm's own array (see Sorting.vector_functions), and counting
+# comparisons (first) and writes (second) done in bulk, which no other
+# operation of the step stands for
+COMPARE = 0
+SWAP = 1
+MOVE = 2
+WRITE = 3
+CYCLE = 4
+BLOCK = 5
+COUNT = 6
+
+# A step: the operations done in it, as (operation, a, b) triples
+Step = Tuple[int, ...]
+
+# The highlights of a SortSteps comparing nothing
+NO_HIGHLIGHTS = (-1, -1)
+
+# Timsort: runs shorter than a minimum between MIN_MERGE / 2 and
+# MIN_MERGE are extended by binary insertion (CPython's is 64, smaller
+# here so the menu's few items still make several runs)
+MIN_MERGE = 16
+
+# Timsort: wins in a row by one run before a merge starts galloping
+MIN_GALLOP = 7
+
+# Introsort: ranges this small are finished by insertion sort
+INTRO_INSERTION = 16
+
+# Pdqsort: ranges smaller than this are finished by insertion sort,
+# ranges bigger than PDQ_NINTHER take a ninther as pivot, and a
+# partial insertion sort gives up after moving items PDQ_PARTIAL places
+PDQ_INSERTION = 24
+PDQ_NINTHER = 128
+PDQ_PARTIAL = 8
+
+
+class Snapshot:
+    """
+    The state of a SortSteps at one step, as taken by its snapshot()
+
+    ==== Public Attributes ====
+    items: a copy of its items
+    step, cycle, comparisons, swaps, writes: its counts
+    highlights: its highlights
+    unsorted: the number of adjacent pairs of items out of order
+    surplus: a copy of its surplus of every value written over others
+    """
+    items: array
+    step: int
+    cycle: int
+    comparisons: int
+    swaps: int
+    writes: int
+    highlights: Tuple[int, int]
+    unsorted: int
+    surplus: Dict[int, int]
+
+    def __init__(self, items: array, step: int, cycle: int,
+                 comparisons: int, swaps: int, writes: int,
+                 highlights: Tuple[int, int], unsorted: int,
+                 surplus: Dict[int, int]) -> None:
+        """Initializes a Snapshot"""
+        self.items = items
+        self.step = step
+        self.cycle = cycle
+        self.comparisons = comparisons
+        self.swaps = swaps
+        self.writes = writes
+        self.highlights = highlights
+        self.unsorted = unsorted
+        self.surplus = surplus
+
 
 class SortSteps:
     """
-    A step in a sorting algorithm that is compatible with
-    the sort visualiser
+    A sorting algorithm played step by step, compatible with the sort
+    visualiser. Subclasses write the algorithm as _sort()
 
     ==== Public Attributes ====
-    items: the current state of the list
-    index: the current item being evaluated
+    items: the current state of the list, as a compact array of ints
     step: the number of steps it took to reach the state in [items]
     cycle: the number of time restarted search
-    indices: all the indices that are being compared, stored in a
-            list
+    comparisons: the number of pairs of items compared
+    swaps: the number of swaps and moves of items
+    writes: the number of items written, two for a swap and every item
+            shifted for a move
+    highlights: the two indices being compared, a fixed slot table: the
+            first is drawn in HIGHLIGHT1, the second in HIGHLIGHT2, -1
+            in a slot for nothing
+    changed: the indices whose items changed since the renderer last
+            drew them, cleared by the renderer
+    trace: records every step, if not None
 
     ==== Private Attributes ====
-    _ans: the sorted version of items
+    _steps: the running _sort()
+    _finished: whether _sort() has no steps left
+    _unsorted: the number of adjacent pairs of items out of order,
+            kept up to date by every operation so that checking for
+            completion is O(1)
+    _surplus: for every value written over others, how many more
+            copies of it items holds than it started with (while an
+            algorithm writes items back from a buffer they are not all
+            there, even if in order)
     """
-    items: List[int]
-    index: int
+    items: array
     step: int
-    _ans: List[int]
     cycle: int
-    indices: List[Tuple]
+    comparisons: int
+    swaps: int
+    writes: int
+    highlights: Tuple[int, int]
+    changed: Set[int]
+    trace: Optional['TraceRecorder']
+    _steps: Iterator[Step]
+    _finished: bool
+    _unsorted: int
+    _surplus: Dict[int, int]
+
+    # Whether passes run over the whole array at once, fast enough to
+    # sort millions of items
+    vectorised = False
 
     def __init__(self, data: List[int]):
         """
         Initialize a SortSteps object
         """
-        self.items = data
-        self.index = 0
+        self.items = array('i', data)
         self.step = 0
-        self._ans = sorted(data)
         self.cycle = 0
-        self.indices = [()]
+        self.comparisons = 0
+        self.swaps = 0
+        self.writes = 0
+        self.highlights = NO_HIGHLIGHTS
+        self.changed = set()
+        self.trace = None
+        self._steps = self._sort(self.items)
+        self._finished = False
+        self._unsorted = sum(1 for k in range(len(data) - 1)
+                             if data[k] > data[k + 1])
+        self._surplus = {}
 
     def iterate(self):
         """One iteration of said sorting algorithm for visualiser"""
-        raise NotImplementedError
+        self.advance(1)
+
+    def advance(self, count: int,
+                highlights: Optional[List[Tuple[int, int]]] = None,
+                whole=False) -> int:
+        """Do up to <count> steps, fewer if sorting completes first, and
+        return how many were done. Every pair compared in every step (the
+        highlights after it, if it compared none) is appended to
+        <highlights> if given. With <whole>, the steps the algorithm
+        still takes once the items are in order (e.g. checking they are)
+        are done too, instead of stopping there"""
+        if count <= 0 or self._finished or not whole and self.complete():
+            return 0
+
+        trace = self.trace
+        done = 0
+        # Counted locally, they're added up once the steps are done
+        compares = swaps = writes = 0
+        for step in self._steps:
+            if len(step) == 3 and step[0] == COMPARE:
+                compares += 1
+                self.highlights = (step[1], step[2])
+                if highlights is not None:
+                    highlights.append(self.highlights)
+            else:
+                compared = False
+                ops = iter(step)
+                for op, a, b in zip(ops, ops, ops):
+                    if op == COMPARE:
+                        compares += 1
+                        self.highlights = (a, b)
+                        if highlights is not None:
+                            highlights.append(self.highlights)
+                            compared = True
+                    elif op == SWAP:
+                        swaps += 1
+                        writes += 2
+                        self._swap(a, b)
+                    elif op == MOVE:
+                        swaps += 1
+                        writes += abs(a - b) + 1
+                        self._move(a, b)
+                    elif op == WRITE:
+                        writes += 1
+                        self._write(a, b)
+                    elif op == BLOCK:
+                        self._block(a, b)
+                    elif op == COUNT:
+                        compares += a
+                        writes += b
+                    else:
+                        self.cycle = a
+                if highlights is not None and not compared:
+                    highlights.append(self.highlights)
+            if trace is not None:
+                trace.step(step, self.items)
+            done += 1
+            if done == count or not self._unsorted and not self._surplus \
+                    and not whole and self.complete():
+                break
+        else:
+            self._finished = True
+        self.step += done
+        self.comparisons += compares
+        self.swaps += swaps
+        self.writes += writes
+        return done
+
+    def snapshot(self) -> Snapshot:
+        """Return the state of the items and counts, as of now"""
+        return Snapshot(array('i', self.items), self.step, self.cycle,
+                        self.comparisons, self.swaps, self.writes,
+                        self.highlights, self._unsorted, dict(self._surplus))
+
+    def restore(self, snapshot: Snapshot) -> None:
+        """Put the items and counts back as they were in <snapshot>, to
+        be drawn in full again. The algorithm doesn't go back with them:
+        only for SortSteps that replay recorded steps, like
+        Sorting.timeline's"""
+        self.items = array('i', snapshot.items)
+        self.step = snapshot.step
+        self.cycle = snapshot.cycle
+        self.comparisons = snapshot.comparisons
+        self.swaps = snapshot.swaps
+        self.writes = snapshot.writes
+        self.highlights = snapshot.highlights
+        self._unsorted = snapshot.unsorted
+        self._surplus = dict(snapshot.surplus)
 
     def get_title(self) -> str:
         """Return the name of this sorting algorithm"""
         raise NotImplementedError
 
+    def _sort(self, items: array) -> Iterator[Step]:
+        """Sort <items>, yielding the operations of every step without
+        doing them: they are done to <items> before the generator
+        resumes"""
+        raise NotImplementedError
+
+    def _swap(self, i: int, j: int) -> None:
+        """Swap the items at <i> and <j>"""
+        if i > j:
+            i, j = j, i
+        items = self.items
+        a, b = items[i], items[j]
+        if a == b:
+            return
+
+        # Only the pairs next to <i> and <j> can change order
+        last = len(items) - 1
+        if j - i == 1:
+            self._unsorted += (b > a) - (a > b) + \
+                (i > 0 and items[i - 1] > b) - (i > 0 and items[i - 1] > a) + \
+                (j < last and a > items[j + 1]) - (j < last and b > items[j + 1])
+        else:
+            self._unsorted += (b > items[i + 1]) - (a > items[i + 1]) + \
+                (items[j - 1] > a) - (items[j - 1] > b) + \
+                (i > 0 and items[i - 1] > b) - (i > 0 and items[i - 1] > a) + \
+                (j < last and a > items[j + 1]) - (j < last and b > items[j + 1])
+        items[i] = b
+        items[j] = a
+        self.changed.add(i)
+        self.changed.add(j)
+
+    def _move(self, src: int, dst: int) -> None:
+        """Take the item at <src> out and insert it at <dst>, shifting
+        the ones in between"""
+        # The shifted items keep their order, only the pairs around
+        # where the item leaves and where it lands change
+        self._unsorted -= self._out_of_order(src - 1) + \
+            self._out_of_order(src)
+        item = self.items.pop(src)
+        self._unsorted += self._out_of_order(src - 1) - \
+            self._out_of_order(dst - 1)
+        self.items.insert(dst, item)
+        self.changed.update(range(min(src, dst), max(src, dst) + 1))
+        self._unsorted += self._out_of_order(dst - 1) + \
+            self._out_of_order(dst)
+
+    def _write(self, i: int, value: int) -> None:
+        """Overwrite the item at <i> with <value>"""
+        items = self.items
+        old = items[i]
+        surplus = self._surplus
+        count = surplus.get(old, 0) - 1
+        if count:
+            surplus[old] = count
+        else:
+            del surplus[old]
+        count = surplus.get(value, 0) + 1
+        if count:
+            surplus[value] = count
+        else:
+            del surplus[value]
+
+        # Only the pairs on either side of <i> can change order
+        last = len(items) - 1
+        self._unsorted += (i > 0 and items[i - 1] > value) + \
+            (i < last and value > items[i + 1]) - \
+            (i > 0 and items[i - 1] > old) - (i < last and old > items[i + 1])
+        items[i] = value
+        self.changed.add(i)
+
+    def _block(self, start: int, stop: int) -> None:
+        """Take items[start:stop] from the algorithm's own array, only
+        for algorithms keeping one"""
+        raise NotImplementedError
+
+    def _take(self, start: int, stop: int, values) -> None:
+        """Overwrite items[start:stop] with <values>, a slice of ints as
+        long, as a block does"""
+        items = self.items
+        if np is not None:
+            # A view, not a copy; dropped before the items change size
+            items = np.frombuffer(items, dtype=np.intc)
+        # Only the pairs within the block and on its edges can change
+        lo, hi = max(start - 1, 0), min(stop + 1, len(items))
+        self._unsorted -= _count_unsorted(items[lo:hi])
+        items[start:stop] = values
+        self._unsorted += _count_unsorted(items[lo:hi])
+
+        self.highlights = (start, stop - 1)
+        # Once every index is marked, marking them again is just slow
+        if len(self.changed) < len(items):
+            self.changed.update(range(start, stop))
+
+    def _out_of_order(self, k: int) -> int:
+        """Return 1 if the items at <k> and <k> + 1 are out of order,
+        0 if they are in order or either doesn't exist"""
+        if 0 <= k < len(self.items) - 1 and \
+                self.items[k] > self.items[k + 1]:
+            return 1
+        return 0
+
+    def bounds(self) -> Tuple[int, int]:
+        """Return the smallest and largest item there is"""
+        if not self.items:
+            return 0, 0
+        return min(self.items), max(self.items)
+
     def complete(self):
         """Return whether the sorting is complete"""
-        return self._ans == self.items
+        return self._unsorted == 0 and not self._surplus or self._finished
 
     def __str__(self):
         """Return the string representation of a SortSteps object"""
-        return "data: " + str(self.items) + "\nsteps: " + str(self.step) \
-               + "\nindex: " + str(self.index)
+        return "data: " + str(list(self.items)) + "\nsteps: " + str(self.step) \
+               + "\ncycle: " + str(self.cycle) \
+               + "\ncomparisons: " + str(self.comparisons) \
+               + "\nswaps: " + str(self.swaps) \
+               + "\nwrites: " + str(self.writes)
 
 
 class BubbleSteps(SortSteps):
 
-    def iterate(self):
+    def _sort(self, items: array) -> Iterator[Step]:
+        n = len(items)
+        step = 0
+        swapped = False
+        index = 0
+        while n > 1:
+            # When at last element, reset
+            if index == n - 1:
+                if not swapped:
+                    return
+                index = 0
+                swapped = False
 
-        if self.complete():
-            return
+            # Swap elements
+            if items[index] > items[index + 1]:
+                ops = (COMPARE, index, index + 1, SWAP, index, index + 1)
+                swapped = True
+            else:
+                ops = (COMPARE, index, index + 1)
 
-        self.step += 1
+            # Updating Cycle, Index
+            index += 1
+            step += 1
+            if step % n == 0:
+                ops += (CYCLE, step // n, 0)
+            yield ops
 
-        # When at last element, reset
-        if self.index == len(self.items) - 1:
-            self.index = 0
+    def get_title(self) -> str:
+        return "Bubble"
 
-        # Swap elements
-        if self.items[self.index] > self.items[self.index + 1]:
-            self.items[self.index], self.items[self.index + 1] = \
-                self.items[self.index + 1], self.items[self.index]
 
-        # Updating Indices affected
-        self.indices[0] = (self.index, self.index + 1, HIGHLIGHT1, HIGHLIGHT2)
+class InsertionSteps(SortSteps):
+
+    def _sort(self, items: array) -> Iterator[Step]:
+        index = 0
+        compare = 0
+        while index < len(items):
+            # Check if it has predecessors
+            if compare >= index:
+                yield COMPARE, compare, index
+                index += 1
+                compare = 0
 
-        # Updating Cycle, Index
-        self.index += 1
-        self.cycle = self.step // len(self.items)
+            # elif found a place for the current item
+            elif items[compare] > items[index]:
+                yield COMPARE, compare, index, MOVE, index, compare
+                compare = 0
+                index += 1
+
+            # compare with a diff element
+            else:
+                yield COMPARE, compare, index
+                compare += 1
 
     def get_title(self) -> str:
-        return "Bubble"
+        return "Insertion"
 
 
-class InsertionSteps(SortSteps):
-    compare: int
+class SelectionSteps(SortSteps):
 
-    def __init__(self, data: List[int]):
-        super().__init__(data)
-        self.compare = 0
+    def _sort(self, items: array) -> Iterator[Step]:
+        n = len(items)
+        cycle = 0
+        index = 0
+        # Index of the lowest item found, -1 for none yet
+        low = -1
+        while cycle < n:
+            ops = ()
+            if low != -1:
+                ops = (COMPARE, index, low)
 
-    def iterate(self):
+            # if index reached
+            if index == n:
+                # Insert found min
+                cycle += 1
+                ops += (MOVE, low, cycle - 1, CYCLE, cycle, 0)
+                index = cycle
+                low = -1
+                if index == n:
+                    yield ops
+                    return
+
+            # Read only once the move is done, if any
+            if low == -1 or items[index] < items[low]:
+                low = index
+
+            index += 1
+            yield ops
 
-        if self.complete():
+    def get_title(self) -> str:
+        return "Selection"
+
+
+class MergeSteps(SortSteps):
+    """
+    Top-down merge sort: sorts both halves, then merges them through a
+    buffer. The cycle is the number of merges done
+    """
+
+    def _sort(self, items: array) -> Iterator[Step]:
+        # Ranges still to sort, and ranges whose halves are sorted and
+        # only need merging (negative lo), so deep inputs don't recurse
+        stack = [(0, len(items))]
+        cycle = 0
+        while stack:
+            lo, hi = stack.pop()
+            if lo < 0:
+                cycle += 1
+                yield from self._merge(items, ~lo, (~lo + hi) // 2, hi,
+                                       (CYCLE, cycle, 0))
+            elif hi - lo > 1:
+                mid = (lo + hi) // 2
+                stack += [(~lo, hi), (mid, hi), (lo, mid)]
+
+    def _merge(self, items: array, lo: int, mid: int, hi: int,
+               last: Step = ()) -> Iterator[Step]:
+        """Merge the sorted runs items[lo:mid] and items[mid:hi], one
+        step per item written. <last> is added to the last step"""
+        # Already in order, nothing to write
+        if items[mid - 1] <= items[mid]:
+            yield (COMPARE, mid - 1, mid) + last
             return
 
-        self.step += 1
-        self.indices[0] = (self.compare, self.index, HIGHLIGHT1, HIGHLIGHT2)
+        buffer = items[lo:hi]
+        left, right = 0, mid - lo
+        for k in range(lo, hi):
+            # Once the left run is written, the rest of the right run is
+            # already in place
+            ops = ()
+            if right < hi - lo:
+                ops = (COMPARE, k, lo + right)
+            if right == hi - lo or buffer[left] <= buffer[right]:
+                value = buffer[left]
+                left += 1
+            else:
+                value = buffer[right]
+                right += 1
+            ops += (WRITE, k, value)
+            if left == mid - lo:
+                yield ops + last
+                return
+            yield ops
 
-        # Check if it has predecessors
-        if self.compare >= self.index:
-            self.index += 1
-            self.compare = 0
+    def get_title(self) -> str:
+        return "Merge"
 
-        # elif found a place for the current item
-        elif self.items[self.compare] > self.items[self.index]:
-            tmp = self.items[self.index]
-            del self.items[self.index]
-            self.items.insert(self.compare, tmp)
-            self.compare = 0
-            self.index += 1
 
-        # compare with a diff element
-        else:
-            self.compare += 1
+class BottomUpMergeSteps(MergeSteps):
+    """
+    Bottom-up merge sort: merges runs of 1, then 2, 4... items. The
+    cycle is the number of passes done
+    """
+
+    def _sort(self, items: array) -> Iterator[Step]:
+        n = len(items)
+        width = 1
+        cycle = 0
+        while width < n:
+            cycle += 1
+            starts = range(0, n - width, 2 * width)
+            for lo in starts:
+                last = (CYCLE, cycle, 0) if lo == starts[-1] else ()
+                yield from self._merge(items, lo, lo + width,
+                                       min(lo + 2 * width, n), last)
+            width *= 2
 
     def get_title(self) -> str:
-        return "Insertion"
+        return "Bottom-Up Merge"
 
 
-class SelectionSteps(SortSteps):
-    low: Tuple
+class QuickSteps(SortSteps):
+    """
+    Quicksort partitioning with Lomuto's scheme: the last item is the
+    pivot, and everything smaller is swapped to the front. The cycle is
+    the number of partitions done
+    """
 
-    def __init__(self, data: List[int]):
-        super().__init__(data)
-        self.low = (float('inf'), -1)
+    def _sort(self, items: array) -> Iterator[Step]:
+        # Ranges (inclusive) still to sort, so sorted inputs, where
+        # Lomuto recurses n deep, don't hit the recursion limit
+        stack = [(0, len(items) - 1)]
+        cycle = 0
+        while stack:
+            lo, hi = stack.pop()
+            if lo < hi:
+                cycle += 1
+                split = yield from self._partition(items, lo, hi,
+                                                   (CYCLE, cycle, 0))
+                stack += self._parts(lo, split, hi)
 
-    def iterate(self):
-        if self.complete():
-            return
+    def _partition(self, items: array, lo: int, hi: int,
+                   last: Step = ()) -> Iterator[Step]:
+        """Partition items[lo:hi + 1] around its last item, one step per
+        comparison, and return where the pivot ends up. <last> is added
+        to the last step"""
+        store = lo
+        for i in range(lo, hi):
+            ops = (COMPARE, i, hi)
+            if items[i] < items[hi]:
+                if i != store:
+                    ops += (SWAP, i, store)
+                store += 1
+            if i == hi - 1:
+                if store != hi:
+                    ops += (SWAP, store, hi)
+                ops += last
+            yield ops
+        return store
 
-        self.step += 1
+    def _parts(self, lo: int, split: int,
+               hi: int) -> List[Tuple[int, int]]:
+        """Return the ranges left to sort once items[lo:hi + 1] is
+        partitioned at <split>"""
+        return [(split + 1, hi), (lo, split - 1)]
+
+    def get_title(self) -> str:
+        return "Lomuto Quick"
 
-        if self.low[1] != -1:
-            self.indices[0] = (self.low[1], self.index, HIGHLIGHT2, HIGHLIGHT1)
 
-        # if index reached
-        if self.index == len(self.items):
-            # Insert found min
-            self.items.insert(self.cycle, self.low[0])
-            del self.items[self.low[1] + 1]
-            self.cycle += 1
-            self.index = self.cycle
-            self.low = (float('inf'), -1)
+class HoareQuickSteps(QuickSteps):
+    """
+    Quicksort partitioning with Hoare's scheme: the middle item is the
+    pivot, and pairs on the wrong sides are swapped inwards from both ends
+    """
 
-        if self.items[self.index] < self.low[0]:
-            self.low = self.items[self.index], self.index
+    def _partition(self, items: array, lo: int, hi: int,
+                   last: Step = ()) -> Iterator[Step]:
+        """Partition items[lo:hi + 1] around its middle item, one step
+        per comparison, and return the last index of the lower part"""
+        pivot = (lo + hi) // 2
+        value = items[pivot]
+        i, j = lo - 1, hi + 1
+        while True:
+            # The pivot is tracked as it is swapped, to highlight it
+            i += 1
+            while items[i] < value:
+                yield COMPARE, i, pivot
+                i += 1
+            yield COMPARE, i, pivot
+            j -= 1
+            while items[j] > value:
+                yield COMPARE, j, pivot
+                j -= 1
+            if i >= j:
+                yield (COMPARE, j, pivot) + last
+                return j
+            yield COMPARE, j, pivot, SWAP, i, j
+            if pivot in (i, j):
+                pivot = i + j - pivot
 
-        self.index += 1
+    def _parts(self, lo: int, split: int,
+               hi: int) -> List[Tuple[int, int]]:
+        return [(split + 1, hi), (lo, split)]
 
     def get_title(self) -> str:
-        return "Selection"
+        return "Hoare Quick"
 
 
-class MergeSteps(SortSteps):
+class MedianQuickSteps(QuickSteps):
+    """
+    Lomuto quicksort with the median of the first, middle and last items
+    as the pivot, so sorted and reversed inputs partition evenly
+    """
 
-    def __init__(self, data: List[int]):
-        super().__init__(data)
-        self.rec_depth = 0
+    def _partition(self, items: array, lo: int, hi: int,
+                   last: Step = ()) -> Iterator[Step]:
+        mid = (lo + hi) // 2
+        if mid != lo:
+            # Order the three, then swap the median to the end
+            for order, (i, j) in enumerate(((lo, mid), (mid, hi), (lo, mid))):
+                ops = (COMPARE, i, j)
+                if items[i] > items[j]:
+                    ops += (SWAP, i, j)
+                if order == 2:
+                    ops += (SWAP, mid, hi)
+                yield ops
+        return (yield from super()._partition(items, lo, hi, last))
+
+    def get_title(self) -> str:
+        return "Median-3 Quick"
 
-    def iterate(self):
-        # TODO: Complete this function
-        # steps = 32 x 4 = 128
-        self.step += 1
-        # [0, 1, 4, 3]
-        # I want to compare(0, 1) and compare(4, 3)
-        if self.index >= len(self.items):
-            self.cycle += 1
-            self.rec_depth += 1
-
-    #     if self.index + self.rec_depth < len(self.items) - 2:
-    #         self.inde
-    #
-    # def _merge(self, a: List[int], b: List[int]) -> :
+
+class HeapSteps(SortSteps):
+    """
+    Heapsort: builds a max-heap in place, then swaps its root to the
+    end of the unsorted part until none is left. The cycle is the
+    number of items taken off the heap
+    """
+
+    def _sort(self, items: array) -> Iterator[Step]:
+        yield from _heap_sort(items, 0, len(items), True)
 
     def get_title(self) -> str:
-        return "Merge"
+        return "Heap"
+
+
+class TimSteps(SortSteps):
+    """
+    Timsort: finds the runs already in order (reversing descending
+    ones), extends short ones by binary insertion and merges them as
+    they pile up, galloping through long stretches won by one run. Runs
+    are always merged through a buffer of the left one. The cycle is
+    the number of merges started
+    """
+
+    def _sort(self, items: array) -> Iterator[Step]:
+        n = len(items)
+        min_run = _min_run(n)
+        runs = []
+        min_gallop = MIN_GALLOP
+        merges = 0
+        lo = 0
+        while True:
+            if lo < n:
+                length = yield from self._count_run(items, lo, n)
+                if length < min_run:
+                    forced = min(min_run, n - lo)
+                    yield from self._binary_insertion(items, lo, lo + forced,
+                                                      lo + length)
+                    length = forced
+                runs.append((lo, length))
+                lo += length
+
+            # Merge while the run lengths break Timsort's invariants,
+            # and everything once there are no runs left to find
+            while len(runs) > 1:
+                i = len(runs) - 2
+                if lo == n or i > 0 and \
+                        runs[i - 1][1] <= runs[i][1] + runs[i + 1][1] or \
+                        i > 1 and runs[i - 2][1] <= runs[i - 1][1] + runs[i][1]:
+                    if i > 0 and runs[i - 1][1] < runs[i + 1][1]:
+                        i -= 1
+                elif runs[i][1] > runs[i + 1][1]:
+                    break
+                merges += 1
+                min_gallop = yield from self._merge_at(
+                    items, runs, i, min_gallop, (CYCLE, merges, 0))
+            if lo == n:
+                return
+
+    def _count_run(self, items: array, lo: int,
+                   n: int) -> Iterator[Step]:
+        """Return the length of the run starting at <lo>, reversing it
+        if it is descending, one step per comparison"""
+        hi = lo + 1
+        if hi == n:
+            return 1
+        yield COMPARE, lo, hi
+        descending = items[hi] < items[lo]
+        hi += 1
+        while hi < n:
+            yield COMPARE, hi - 1, hi
+            if (items[hi] < items[hi - 1]) != descending:
+                break
+            hi += 1
+
+        if descending:
+            ops = []
+            i, j = lo, hi - 1
+            while i < j:
+                ops += (SWAP, i, j)
+                i += 1
+                j -= 1
+            yield tuple(ops)
+        return hi - lo
+
+    def _binary_insertion(self, items: array, lo: int, hi: int,
+                          start: int) -> Iterator[Step]:
+        """Sort items[lo:hi], of which items[lo:start] are in order, by
+        inserting the rest where bisection finds their place"""
+        for i in range(start, hi):
+            left, right = lo, i
+            while True:
+                mid = (left + right) // 2
+                ops = (COMPARE, mid, i)
+                if items[i] < items[mid]:
+                    right = mid
+                else:
+                    left = mid + 1
+                if left >= right:
+                    break
+                yield ops
+            if left != i:
+                ops += (MOVE, i, left)
+            yield ops
+
+    def _merge_at(self, items: array, runs: List[Tuple[int, int]],
+                  i: int, min_gallop: int, first: Step) -> Iterator[Step]:
+        """Merge the runs <i> and <i> + 1 and return the new min_gallop.
+        <first> is put before the first step"""
+        a, a_len = runs[i]
+        b, b_len = runs[i + 1]
+        runs[i] = (a, a_len + b_len)
+        del runs[i + 1]
+
+        # The items of the left run no bigger than the right run's first
+        # are in place already, and so are the items of the right run no
+        # smaller than the left run's last
+        skip = yield from self._gallop(items[b], items, a, a_len, 0, True,
+                                       a, b, first)
+        a += skip
+        a_len -= skip
+        if a_len == 0:
+            return min_gallop
+        b_len = yield from self._gallop(items[a + a_len - 1], items, b, b_len,
+                                        b_len - 1, False, b, a + a_len - 1)
+        if b_len == 0:
+            return min_gallop
+        return (yield from self._merge_lo(items, a, a_len, b, b_len,
+                                          min_gallop))
+
+    def _merge_lo(self, items: array, lo: int, a_len: int, b: int,
+                  b_len: int, min_gallop: int) -> Iterator[Step]:
+        """Merge the left run items[lo:lo + a_len] through a buffer with
+        the right run items[b:b + b_len] after it, and return the new
+        min_gallop"""
+        buffer = items[lo:lo + a_len]
+        i, j, k = 0, b, lo
+        b_end = b + b_len
+        while i < a_len and j < b_end:
+            # One item at a time, until a run wins min_gallop in a row
+            a_wins = b_wins = 0
+            while i < a_len and j < b_end and \
+                    a_wins < min_gallop and b_wins < min_gallop:
+                ops = (COMPARE, k, j)
+                if items[j] < buffer[i]:
+                    value = items[j]
+                    j += 1
+                    b_wins += 1
+                    a_wins = 0
+                else:
+                    value = buffer[i]
+                    i += 1
+                    a_wins += 1
+                    b_wins = 0
+                yield ops + (WRITE, k, value)
+                k += 1
+            if i == a_len or j == b_end:
+                break
+
+            # Then galloping to where the other run's next item goes and
+            # taking everything before it in one step, for as long as
+            # that finds long stretches
+            min_gallop += 1
+            while True:
+                min_gallop -= min_gallop > 1
+                a_wins = yield from self._gallop(items[j], buffer, i,
+                                                 a_len - i, 0, True, k, j)
+                # Only written at indices before <j>, so the items of the
+                # right run read here are not written yet
+                ops = []
+                for _ in range(a_wins):
+                    ops += (WRITE, k, buffer[i])
+                    i += 1
+                    k += 1
+                if i < a_len:
+                    ops += (WRITE, k, items[j])
+                    j += 1
+                    k += 1
+                yield tuple(ops)
+                if i == a_len or j == b_end:
+                    break
+
+                b_wins = yield from self._gallop(buffer[i], items, j,
+                                                 b_end - j, 0, False, j, k)
+                ops = []
+                for _ in range(b_wins):
+                    ops += (WRITE, k, items[j])
+                    j += 1
+                    k += 1
+                if j < b_end:
+                    ops += (WRITE, k, buffer[i])
+                    i += 1
+                    k += 1
+                yield tuple(ops)
+                if i == a_len or j == b_end or \
+                        a_wins < MIN_GALLOP and b_wins < MIN_GALLOP:
+                    break
+            min_gallop += 1
+
+        # What is left of the right run is in place already
+        if i < a_len:
+            ops = []
+            for value in buffer[i:]:
+                ops += (WRITE, k, value)
+                k += 1
+            yield tuple(ops)
+        return min_gallop
+
+    def _gallop(self, key: int, seq: array, base: int, n: int,
+                hint: int, right: bool, at: int, other: int,
+                first: Step = ()) -> Iterator[Step]:
+        """Return how many items of the sorted seq[base:base + n] go
+        before <key>: those smaller, or with <right> no bigger, than it.
+        Searches outwards from <hint> in growing strides, then bisects,
+        one step per comparison, showing seq[base + i] at index <at> + i
+        compared with <other>. <first> is put before the first step"""
+        if right:
+            def before(x: int) -> bool:
+                return x <= key
+        else:
+            def before(x: int) -> bool:
+                return x < key
+
+        last, ofs = 0, 1
+        yield first + (COMPARE, at + hint, other)
+        if before(seq[base + hint]):
+            # Stride right until seq[hint + last] is before and
+            # seq[hint + ofs] isn't
+            limit = n - hint
+            while ofs < limit:
+                yield COMPARE, at + hint + ofs, other
+                if not before(seq[base + hint + ofs]):
+                    break
+                last, ofs = ofs, 2 * ofs + 1
+            ofs = min(ofs, limit)
+            last, ofs = hint + last, hint + ofs
+        else:
+            # Stride left until seq[hint - ofs] is before and
+            # seq[hint - last] isn't
+            limit = hint + 1
+            while ofs < limit:
+                yield COMPARE, at + hint - ofs, other
+                if before(seq[base + hint - ofs]):
+                    break
+                last, ofs = ofs, 2 * ofs + 1
+            ofs = min(ofs, limit)
+            last, ofs = hint - ofs, hint - last
+
+        # The answer is in (last, ofs]
+        last += 1
+        while last < ofs:
+            mid = (last + ofs) // 2
+            yield COMPARE, at + mid, other
+            if before(seq[base + mid]):
+                last = mid + 1
+            else:
+                ofs = mid
+        return ofs
+
+    def get_title(self) -> str:
+        return "Tim"
+
+
+class IntroSteps(MedianQuickSteps):
+    """
+    Introsort: median-of-three quicksort that switches to heapsort on
+    ranges partitioned too many times (2 log n), so it can't go
+    quadratic, and to insertion sort on small ranges. The cycle is the
+    number of partitions done
+    """
+
+    def _sort(self, items: array) -> Iterator[Step]:
+        n = len(items)
+        stack = [(0, n - 1, 2 * (n.bit_length() - 1))]
+        cycle = 0
+        while stack:
+            lo, hi, depth = stack.pop()
+            if hi - lo < INTRO_INSERTION:
+                yield from _insertion_sort(items, lo, hi + 1)
+            elif depth == 0:
+                yield from _heap_sort(items, lo, hi + 1)
+            else:
+                cycle += 1
+                split = yield from self._partition(items, lo, hi,
+                                                   (CYCLE, cycle, 0))
+                stack += [(split + 1, hi, depth - 1),
+                          (lo, split - 1, depth - 1)]
+
+    def get_title(self) -> str:
+        return "Intro"
+
+
+class PdqSteps(SortSteps):
+    """
+    Pattern-defeating quicksort (Orson Peters): quicksort with a median
+    of three (ninther for big ranges) pivot that
+    - leaves the items equal to the pivot out when the item before the
+      range is equal to it too, so few unique values go fast
+    - tries a bounded insertion sort on both sides of a partition that
+      moved nothing, so sorted runs go in linear time
+    - breaks patterns by swapping a few items after a badly unbalanced
+      partition, and turns to heapsort after log n of them
+    Its branchless block partitioning is left out, being about CPU
+    branch prediction. The cycle is the number of partitions done
+    """
+
+    def _sort(self, items: array) -> Iterator[Step]:
+        n = len(items)
+        # Ranges [begin, end), whether they start the list, and how many
+        # bad partitions they are allowed
+        stack = [(0, n, True, n.bit_length() - 1)]
+        cycle = 0
+        while stack:
+            begin, end, leftmost, bad_allowed = stack.pop()
+            size = end - begin
+            if size < PDQ_INSERTION:
+                yield from _insertion_sort(items, begin, end)
+                continue
+
+            half = size // 2
+            if size > PDQ_NINTHER:
+                yield from self._sort3(items, begin, begin + half, end - 1)
+                yield from self._sort3(items, begin + 1, begin + half - 1,
+                                       end - 2)
+                yield from self._sort3(items, begin + 2, begin + half + 1,
+                                       end - 3)
+                yield from self._sort3(items, begin + half - 1, begin + half,
+                                       begin + half + 1)
+                yield SWAP, begin, begin + half
+            else:
+                yield from self._sort3(items, begin + half, begin, end - 1)
+
+            # Equal to the item before the range, so no smaller than
+            # anything in it: the items equal to the pivot are done
+            cycle += 1
+            if not leftmost:
+                yield COMPARE, begin - 1, begin
+                if not items[begin - 1] < items[begin]:
+                    pivot = yield from self._partition_left(
+                        items, begin, end, (CYCLE, cycle, 0))
+                    stack.append((pivot + 1, end, False, bad_allowed))
+                    continue
+
+            pivot, unmoved = yield from self._partition_right(
+                items, begin, end, (CYCLE, cycle, 0))
+            left, right = pivot - begin, end - pivot - 1
+            if left < size // 8 or right < size // 8:
+                bad_allowed -= 1
+                if bad_allowed == 0:
+                    yield from _heap_sort(items, begin, end)
+                    continue
+                yield from self._break_patterns(items, begin, pivot, end)
+            elif unmoved:
+                sorted_left = yield from _insertion_sort(
+                    items, begin, pivot, PDQ_PARTIAL)
+                if sorted_left:
+                    sorted_right = yield from _insertion_sort(
+                        items, pivot + 1, end, PDQ_PARTIAL)
+                    if sorted_right:
+                        continue
+            stack += [(pivot + 1, end, False, bad_allowed),
+                      (begin, pivot, leftmost, bad_allowed)]
+
+    def _sort3(self, items: array, a: int, b: int,
+               c: int) -> Iterator[Step]:
+        """Order the items at <a>, <b> and <c>, one step per comparison"""
+        for i, j in ((a, b), (b, c), (a, b)):
+            if items[j] < items[i]:
+                yield COMPARE, i, j, SWAP, i, j
+            else:
+                yield COMPARE, i, j
+
+    def _partition_right(self, items: array, begin: int, end: int,
+                         last: Step) -> Iterator[Step]:
+        """Partition items[begin:end] around its first item, the items
+        equal to it going right. Return where it ends up and whether no
+        item had to move. <last> is added to the last step"""
+        pivot = items[begin]
+        first, end_ = begin + 1, end
+        # The median of three guarantees an item no smaller than the
+        # pivot on the right, and one no bigger than it on the left
+        while True:
+            yield COMPARE, first, begin
+            if not items[first] < pivot:
+                break
+            first += 1
+        while first < end_:
+            end_ -= 1
+            yield COMPARE, end_, begin
+            if items[end_] < pivot:
+                break
+        unmoved = first >= end_
+
+        while first < end_:
+            yield SWAP, first, end_
+            while True:
+                first += 1
+                yield COMPARE, first, begin
+                if not items[first] < pivot:
+                    break
+            while True:
+                end_ -= 1
+                yield COMPARE, end_, begin
+                if items[end_] < pivot:
+                    break
+
+        split = first - 1
+        yield (SWAP, begin, split) + last
+        return split, unmoved
+
+    def _partition_left(self, items: array, begin: int, end: int,
+                        last: Step) -> Iterator[Step]:
+        """Partition items[begin:end] around its first item, the items
+        equal to it going left, and return where it ends up. <last> is
+        added to the last step"""
+        pivot = items[begin]
+        first, end_ = begin, end
+        while True:
+            end_ -= 1
+            yield COMPARE, end_, begin
+            if not pivot < items[end_]:
+                break
+        while first < end_:
+            first += 1
+            yield COMPARE, first, begin
+            if pivot < items[first]:
+                break
+
+        while first < end_:
+            yield SWAP, first, end_
+            while True:
+                end_ -= 1
+                yield COMPARE, end_, begin
+                if not pivot < items[end_]:
+                    break
+            while True:
+                first += 1
+                yield COMPARE, first, begin
+                if pivot < items[first]:
+                    break
+
+        yield (SWAP, begin, end_) + last
+        return end_
+
+    def _break_patterns(self, items: array, begin: int, pivot: int,
+                        end: int) -> Iterator[Step]:
+        """Swap a few items of both sides of a badly unbalanced
+        partition around, in one step"""
+        pairs = []
+        left, right = pivot - begin, end - pivot - 1
+        if left >= PDQ_INSERTION:
+            quarter = left // 4
+            pairs += [(begin, begin + quarter), (pivot - 1, pivot - quarter)]
+            if left > PDQ_NINTHER:
+                pairs += [(begin + 1, begin + quarter + 1),
+                          (begin + 2, begin + quarter + 2),
+                          (pivot - 2, pivot - quarter - 1),
+                          (pivot - 3, pivot - quarter - 2)]
+        if right >= PDQ_INSERTION:
+            quarter = right // 4
+            pairs += [(pivot + 1, pivot + 1 + quarter),
+                      (end - 1, end - quarter)]
+            if right > PDQ_NINTHER:
+                pairs += [(pivot + 2, pivot + 2 + quarter),
+                          (pivot + 3, pivot + 3 + quarter),
+                          (end - 2, end - quarter - 1),
+                          (end - 3, end - quarter - 2)]
+        ops = []
+        for i, j in pairs:
+            ops += (SWAP, i, j)
+        if ops:
+            yield tuple(ops)
+
+    def get_title(self) -> str:
+        return "Pdq"
+
+
+def _min_run(n: int) -> int:
+    """Return Timsort's minimum run length for <n> items"""
+    odd = 0
+    while n >= MIN_MERGE:
+        odd |= n & 1
+        n >>= 1
+    return n + odd
+
+
+def _insertion_sort(items: array, lo: int, hi: int,
+                    limit: Optional[int] = None) -> Iterator[Step]:
+    """Sort items[lo:hi] by insertion, one step per comparison, and
+    return whether it was sorted. With <limit>, give up (returning
+    False) once items were moved more than <limit> places in all"""
+    moved = 0
+    for i in range(lo + 1, hi):
+        # The last comparison's step also moves the item
+        j = i
+        while True:
+            ops = (COMPARE, j - 1, i)
+            if not items[i] < items[j - 1]:
+                break
+            j -= 1
+            if j == lo:
+                break
+            yield ops
+        if j != i:
+            ops += (MOVE, i, j)
+            moved += i - j
+        yield ops
+        if limit is not None and moved > limit:
+            return False
+    return True
+
+
+def _heap_sort(items: array, lo: int, hi: int,
+               cycles=False) -> Iterator[Step]:
+    """Heapsort items[lo:hi], one step per comparison. With <cycles>,
+    the cycle is set to the number of items taken off the heap"""
+    n = hi - lo
+    for root in range(n // 2 - 1, -1, -1):
+        yield from _sift_down(items, lo, root, n, items[lo + root])
+    for end in range(n - 1, 0, -1):
+        # The last item of the heap is sifted down once swapped to its root
+        first = (SWAP, lo, lo + end)
+        if cycles:
+            first += (CYCLE, n - end, 0)
+        yield from _sift_down(items, lo, 0, end, items[lo + end], first)
+
+
+def _sift_down(items: array, lo: int, root: int, end: int, value: int,
+               first: Step = ()) -> Iterator[Step]:
+    """Move the item at <root>, <value> once <first> is done, down the
+    heap items[lo:lo + end] (indices relative to <lo>) until it is no
+    smaller than its children, one step per comparison. <first> is put
+    before the first step"""
+    ops = first
+    while 2 * root + 1 < end:
+        child = 2 * root + 1
+        if child + 1 < end:
+            yield ops + (COMPARE, lo + child, lo + child + 1)
+            ops = ()
+            if items[lo + child] < items[lo + child + 1]:
+                child += 1
+        ops += (COMPARE, lo + root, lo + child)
+        if value >= items[lo + child]:
+            break
+        yield ops + (SWAP, lo + root, lo + child)
+        ops = ()
+        root = child
+    if ops:
+        yield ops
+
+
+def _count_unsorted(items) -> int:
+    """Return the number of adjacent pairs of <items>, an array of ints
+    (a numpy one if numpy is installed), out of order"""
+    if np is not None:
+        return int(np.count_nonzero(items[:-1] > items[1:]))
+    return sum(map(operator.gt, items, items[1:]))
 
 
 def _color_generator() -> Tuple:
@@ -0,0 +1,472 @@
+"""
+The Sorting Visualiser for main.py (Algrow)
+"""
+
+import random
+import pygame as pg
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from visual_helpers import *
+from display import present
+from scene_manager import HoldScene, Scene, SceneManager
+from Sorting.sort_functions import SortSteps
+from Sorting.timeline import Timeline
+
+# Sorting steps per second
+SORT_RATE = 40
+
+# Bar layout
+BAR_X = 50
+BAR_WIDTH = 10
+BAR_BOTTOM = 25
+BARS_TOP = HEIGHT - VISUALIZE_HEIGHT
+
+# The area all the bars fit in
+PLOT_WIDTH = WIDTH - 96
+PLOT_HEIGHT = HEIGHT - BAR_BOTTOM - BARS_TOP
+
+# Above this many items, bars are at most a pixel wide and are drawn
+# into a pixel buffer instead (if numpy is installed)
+PIXEL_ITEMS = PLOT_WIDTH // 2
+
+# The timeline under the bars: its track, the area cleared to redraw
+# it (knob included) and the area a click grabs it in
+TIMELINE = pg.Rect(BAR_X, HEIGHT - 18, PLOT_WIDTH, 4)
+TIMELINE_AREA = TIMELINE.inflate(12, 10)
+TIMELINE_GRAB = TIMELINE.inflate(16, 16)
+TIMELINE_KNOB = 5
+
+# Keys stepping back and forth through the timeline
+BACK_KEYS = [pg.K_LEFT]
+FORWARD_KEYS = [pg.K_RIGHT]
+
+
+def _shuffled(items: List[int], rng: random.Random) -> List[int]:
+    """ In random order """
+    rng.shuffle(items)
+    return items
+
+
+def _nearly_sorted(items: List[int], rng: random.Random) -> List[int]:
+    """ Sorted, but for a few items swapped with close neighbours """
+    for _ in range(max(1, len(items) // 20)):
+        i = rng.randrange(len(items))
+        j = min(len(items) - 1, i + rng.randint(1, 3))
+        items[i], items[j] = items[j], items[i]
+    return items
+
+
+def _few_unique(items: List[int], rng: random.Random) -> List[int]:
+    """ Only four different heights, in random order """
+    levels = [items[(2 * k + 1) * len(items) // 8] for k in range(4)]
+    return [rng.choice(levels) for _ in items]
+
+
+# The inputs that can be sorted: each turns the items, in order, into
+# the list to sort
+WORKLOADS: Dict[str, Callable[[List[int], random.Random], List[int]]] = {
+    "Shuffled": _shuffled,
+    "Nearly Sorted": _nearly_sorted,
+    "Reversed": lambda items, rng: items[::-1],
+    # Four ascending runs, each over the whole range
+    "Sawtooth": lambda items, rng: [item for k in range(4)
+                                    for item in items[k::4]],
+    "Few Unique": _few_unique,
+    # Ascending, then descending
+    "Organ Pipe": lambda items, rng: items[::2] + items[1::2][::-1],
+}
+
+
+def sort_items(size: Optional[int] = None,
+               rng: Optional[random.Random] = None,
+               workload="Shuffled") -> List[int]:
+    """ Return items (bar heights) to sort, arranged as <workload>: the
+    menu's usual ones, or <size> of them spread over the visualiser's
+    height """
+    if size is None:
+        items = [i for i in range(35, VISUALIZE_HEIGHT, 15)]
+    else:
+        items = [35 + (VISUALIZE_HEIGHT - 35) * i // size
+                 for i in range(size)]
+    if not items:
+        return items
+    return WORKLOADS[workload](items, rng or random)
+
+
+class SortRenderer:
+    """
+    Draws a <SortSteps> on the screen. After the first full frame only
+    the bars whose item changed (<data.changed>) or whose highlight
+    changed are repainted and pushed to the display. Heights are read
+    straight from <data.items>. When several steps run in one frame,
+    every pair they compared is highlighted
+
+    ==== Public Attributes ====
+    screen: The surface to draw on
+    data: The SortSteps being visualised
+
+    ==== Private Attributes ====
+    _highlights: The color of every highlighted bar as of the last frame
+    _pairs: The pairs compared during the last batch of steps, None to
+            follow <data.highlights>
+    _spacing: Distance between the left edges of two bars
+    _width: Width of one bar
+    """
+
+    screen: pg.Surface
+    data: SortSteps
+    _highlights: Dict[int, Tuple[int]]
+    _pairs: Optional[List[Tuple[int, int]]]
+    _spacing: int
+    _width: int
+
+    def __init__(self, screen: pg.Surface, data: SortSteps) -> None:
+        """ Initializes a SortRenderer for <data> on <screen> """
+        self.screen = screen
+        self.data = data
+        self._highlights = {}
+        self._pairs = None
+
+        self._spacing = max(1, PLOT_WIDTH // max(1, len(data.items)))
+        if self._spacing > BAR_WIDTH:
+            self._width = BAR_WIDTH
+        else:
+            self._width = max(1, self._spacing - 1)
+
+    def full_redraw(self) -> None:
+        """ Draws the whole screen (chrome and every bar) and flips """
+        draw_chrome(self.screen, self.data.get_title() + " Sort")
+
+        self.data.changed.clear()
+        self._highlights = self._current_highlights()
+        for i in range(len(self.data.items)):
+            self._draw_bar(i)
+
+        present()
+
+    def update(self) -> List[pg.Rect]:
+        """ Repaints the bars that changed since the last frame, presents
+        them and returns their rects """
+        dirty = self.data.changed
+        highlights = self._current_highlights()
+        if highlights != self._highlights:
+            dirty.update(self._highlights)
+            dirty.update(highlights)
+            self._highlights = highlights
+
+        rects = [self._draw_bar(i) for i in dirty
+                 if 0 <= i < len(self.data.items)]
+        dirty.clear()
+        if rects:
+            present(rects)
+        return rects
+
+    def highlight(self, pairs: List[Tuple[int, int]]) -> None:
+        """ Highlight every pair of indices in <pairs>, those compared
+        during the last batch of steps """
+        self._pairs = pairs
+
+    def bar_color(self, n: int) -> Tuple[int]:
+        """ Return the color of the bar at index <n> """
+        return self._highlights.get(n, BARS)
+
+    def _current_highlights(self) -> Dict[int, Tuple[int]]:
+        """ Return the color of every bar to highlight right now """
+        if self.data.complete():
+            return {}
+
+        colors = {}
+        pairs = [self.data.highlights] if self._pairs is None else self._pairs
+        for first, second in pairs:
+            colors[second] = HIGHLIGHT2
+            colors[first] = HIGHLIGHT1
+        return colors
+
+    def _column(self, n: int) -> pg.Rect:
+        """ Return the area of the screen the bar at <n> can cover """
+        x = BAR_X + n * self._spacing
+        return pg.Rect(x, BARS_TOP, self._width, PLOT_HEIGHT)
+
+    def _draw_bar(self, n: int) -> pg.Rect:
+        """ Clears the column of the bar at <n>, draws the bar and
+        returns the column """
+        column = self._column(n)
+        elem = self.data.items[n]
+        pg.draw.rect(self.screen, BACKGROUND, column)
+        pg.draw.rect(self.screen, self.bar_color(n),
+                     (column.x, HEIGHT - elem, self._width, elem - BAR_BOTTOM))
+        return column
+
+
+class PixelRenderer:
+    """
+    Draws a <SortSteps> with far more items than the screen has pixels
+    across. Every pixel column of the plot shows the mean of the items
+    falling in it (or one item, widened, if there are fewer items than
+    columns). The columns are written straight into the pixels of a
+    surface with numpy, from a view of <data.items>, and shown with
+    one blit.
+    Item values are scaled to fit the plot's height
+
+    ==== Public Attributes ====
+    screen: The surface to draw on
+    data: The SortSteps being visualised
+
+    ==== Private Attributes ====
+    _plot: The surface the columns are written into
+    _bars: BARS as a pixel value of <_plot>
+    _background: BACKGROUND as a pixel value of <_plot>
+    _starts: The first item of every column
+    _counts: The number of items in every column
+    _low: The smallest item
+    _scale: Pixels of height per unit of an item above <_low>
+    _rows: The row number of every row of the plot
+    _highlights: The color of every highlighted column as of the last
+                 frame
+    _pairs: The pairs compared during the last batch of steps, None to
+            follow <data.highlights>
+    """
+
+    screen: pg.Surface
+    data: SortSteps
+    _plot: pg.Surface
+    _bars: int
+    _background: int
+    _starts: 'np.ndarray'
+    _counts: 'np.ndarray'
+    _low: int
+    _scale: float
+    _rows: 'np.ndarray'
+    _highlights: Dict[int, Tuple[int]]
+    _pairs: Optional[List[Tuple[int, int]]]
+
+    def __init__(self, screen: pg.Surface, data: SortSteps) -> None:
+        """ Initializes a PixelRenderer for <data> on <screen> """
+        self.screen = screen
+        self.data = data
+        self._plot = pg.Surface((PLOT_WIDTH, PLOT_HEIGHT), 0, 32)
+        self._bars = self._plot.map_rgb(BARS)
+        self._background = self._plot.map_rgb(BACKGROUND)
+        self._highlights = {}
+        self._pairs = None
+
+        n = len(data.items)
+        self._starts = np.arange(PLOT_WIDTH) * n // PLOT_WIDTH
+        # With fewer items than columns, a column repeats its item
+        self._counts = np.maximum(np.diff(self._starts, append=n), 1)
+
+        self._low, high = data.bounds()
+        self._scale = (PLOT_HEIGHT - 1) / max(1, high - self._low)
+        self._rows = np.arange(PLOT_HEIGHT)
+
+    def full_redraw(self) -> None:
+        """ Draws the whole screen (chrome and plot) and flips """
+        draw_chrome(self.screen, self.data.get_title() + " Sort")
+        self._highlights = self._current_highlights()
+        self._draw_plot()
+        self.data.changed.clear()
+        present()
+
+    def update(self) -> List[pg.Rect]:
+        """ Redraws the plot if anything changed since the last frame,
+        presents it and returns its rect """
+        highlights = self._current_highlights()
+        if not self.data.changed and highlights == self._highlights:
+            return []
+
+        self._highlights = highlights
+        rect = self._draw_plot()
+        self.data.changed.clear()
+        present([rect])
+        return [rect]
+
+    def highlight(self, pairs: List[Tuple[int, int]]) -> None:
+        """ Highlight every pair of indices in <pairs>, those compared
+        during the last batch of steps """
+        self._pairs = pairs
+
+    def _current_highlights(self) -> Dict[int, Tuple[int]]:
+        """ Return the color of every column to highlight right now """
+        if self.data.complete():
+            return {}
+
+        n = len(self.data.items)
+        colors = {}
+        pairs = [self.data.highlights] if self._pairs is None else self._pairs
+        for first, second in pairs:
+            if 0 <= second < n:
+                colors[second * PLOT_WIDTH // n] = HIGHLIGHT2
+            if 0 <= first < n:
+                colors[first * PLOT_WIDTH // n] = HIGHLIGHT1
+        return colors
+
+    def _draw_plot(self) -> pg.Rect:
+        """ Draws every column into the plot, blits it to the screen
+        and returns where """
+        # A view, not a copy; dropped before the items change again
+        items = np.frombuffer(self.data.items, dtype=np.intc)
+        means = np.add.reduceat(items.astype(np.int64), self._starts) \
+            / self._counts
+        heights = ((means - self._low) * self._scale).astype(np.intp) + 1
+
+        colors = np.full(PLOT_WIDTH, self._bars, dtype=np.uint32)
+        for column, color in self._highlights.items():
+            colors[column] = self._plot.map_rgb(color)
+
+        filled = self._rows[None, :] >= PLOT_HEIGHT - heights[:, None]
+        pixels = pg.surfarray.pixels2d(self._plot)
+        pixels[...] = np.where(filled, colors[:, None], self._background)
+        # The plot stays locked while its pixels are referenced
+        del pixels
+        return self.screen.blit(self._plot, (BAR_X, BARS_TOP))
+
+
+def make_renderer(screen: pg.Surface,
+                  data: SortSteps) -> Union[SortRenderer, PixelRenderer]:
+    """ Return the renderer drawing <data> on <screen>: a bar each, or
+    a pixel buffer for very many items """
+    if np is not None and len(data.items) > PIXEL_ITEMS:
+        return PixelRenderer(screen, data)
+    return SortRenderer(screen, data)
+
+
+class SortScene(Scene):
+    """
+    Plays a sorting algorithm. Clicking pauses/resumes it. The timeline
+    under the bars can be dragged to any step played so far, and the
+    left and right arrows step back and forth (pausing it)
+
+    ==== Public Attributes ====
+    data: The sorting algorithm being played
+    timeline: The history of <data>, and the step of it shown
+    renderer: Draws the step shown
+
+    ==== Private Attributes ====
+    _dragging: Whether the timeline is being dragged
+    _drawn: The first, shown and last step of the timeline as last drawn
+    """
+
+    data: SortSteps
+    timeline: Timeline
+    renderer: Union[SortRenderer, PixelRenderer]
+    _dragging: bool
+    _drawn: Optional[Tuple[int, int, int]]
+    rate = SORT_RATE
+
+    def __init__(self, manager: SceneManager, data: SortSteps) -> None:
+        super().__init__(manager)
+        self.data = data
+        self.timeline = Timeline(data)
+        self.renderer = make_renderer(self.screen, data)
+        self.blocking = False
+        self._dragging = False
+        self._drawn = None
+
+    def enter(self) -> None:
+        self.renderer.full_redraw()
+        self._drawn = None
+        self._draw_timeline()
+
+    def handle(self, event: pg.event.Event) -> None:
+        if event.type == pg.MOUSEBUTTONDOWN and event.button == 1 and \
+                TIMELINE_GRAB.collidepoint(event.pos):
+            self._dragging = True
+            self._pause(True)
+            self._seek_to(event.pos[0])
+        elif event.type == pg.MOUSEMOTION and self._dragging:
+            self._seek_to(event.pos[0])
+        elif event.type == pg.MOUSEBUTTONUP:
+            if self._dragging:
+                self._dragging = False
+            else:
+                self._pause(not self.scheduler.paused)
+        elif event.type == pg.KEYDOWN and event.key in BACK_KEYS:
+            self._pause(True)
+            self.timeline.seek(self.timeline.view.step - 1)
+            self.renderer.highlight([self.timeline.view.highlights])
+        elif event.type == pg.KEYDOWN and event.key in FORWARD_KEYS:
+            self._pause(True)
+            pairs = []
+            self.timeline.advance(1, pairs)
+            self.renderer.highlight(pairs)
+
+    def update(self, steps: int) -> None:
+        if self.scheduler.paused:
+            return
+
+        if self.timeline.view is self.data and self.data.complete():
+            data = self.data
+            stats = HoldScene(self.manager, 6000,
+                              lambda screen: sort_end(screen, data))
+            self.manager.replace(HoldScene(self.manager, 2000, then=stats))
+            return
+
+        # Every pair compared during the batch is highlighted
+        pairs = []
+        self.timeline.advance(steps, pairs)
+        if pairs:
+            self.renderer.highlight(pairs)
+
+    def draw(self) -> None:
+        # A step from another replay (or back to the algorithm) shares
+        # nothing with what is on screen
+        if self.renderer.data is not self.timeline.view:
+            self.renderer.data = self.timeline.view
+            self.renderer.full_redraw()
+            self._drawn = None
+        else:
+            self.renderer.update()
+        self._draw_timeline()
+
+    def _pause(self, paused: bool) -> None:
+        """ Pause or resume the algorithm """
+        # Nothing changes while paused, so sleep until the next event
+        self.scheduler.paused = paused
+        self.blocking = paused
+        self.scheduler.reset()
+
+    def _seek_to(self, x: int) -> None:
+        """ Show the step of the timeline at <x> on screen """
+        timeline = self.timeline
+        share = min(1.0, max(0.0, (x - TIMELINE.x) / TIMELINE.w))
+        timeline.seek(timeline.first +
+                      round(share * (timeline.last - timeline.first)))
+        self.renderer.highlight([timeline.view.highlights])
+
+    def _draw_timeline(self) -> None:
+        """ Draw the timeline, if it moved, and present it """
+        timeline = self.timeline
+        drawn = (timeline.first, timeline.view.step, timeline.last)
+        if drawn == self._drawn:
+            return
+        self._drawn = drawn
+
+        first, shown, last = drawn
+        share = (shown - first) / (last - first) if last > first else 1.0
+        x = TIMELINE.x + round(share * TIMELINE.w)
+        pg.draw.rect(self.screen, BACKGROUND, TIMELINE_AREA)
+        pg.draw.rect(self.screen, LIGHT_BG, TIMELINE)
+        pg.draw.rect(self.screen, BARS, (TIMELINE.x, TIMELINE.y,
+                                         x - TIMELINE.x, TIMELINE.h))
+        pg.draw.circle(self.screen, HIGHLIGHT1, (x, TIMELINE.centery),
+                       TIMELINE_KNOB)
+        present([TIMELINE_AREA])
+
+
+def sort_end(screen: pg.Surface, data: SortSteps) -> None:
+    """
+    Once it's finished sorting
+    """
+    # Labels
+    draw_chrome(screen, data.get_title() + " Sort" + " Statistics")
+    stats = [("Step(s)", data.step), ("Comparisons", data.comparisons),
+             ("Swaps/Moves", data.swaps), ("Writes", data.writes),
+             ("Cycle", data.cycle)]
+    for i, (label, value) in enumerate(stats):
+        write_text(screen, label + ": " + str(value), get_font(50), TEXT,
+                   (50, 150 + i * 75))
@@ -0,0 +1,195 @@
+"""
+Stepping back and seeking through a sorting algorithm as it plays.
+
+A Timeline records every step of a SortSteps as the operations done in
+it, the compact per-step deltas of a Trace, cut into segments that each
+start at a keyframe: a full snapshot of the items and counts. A new
+keyframe is taken once the log since the last one holds as many ints as
+a snapshot does (and at least KEYFRAME_INTS), so snapshots never take
+more memory than the log, and getting to any step restores the keyframe
+before it and replays at most one segment. The algorithm itself keeps
+running from its latest step; earlier steps are shown by a replay of
+the history. Once the history holds more than HISTORY_INTS, its oldest
+segments are dropped.
+"""
+
+from array import array
+from bisect import bisect_right
+from typing import Iterator, List, Optional, Tuple
+
+from Sorting.sort_functions import SortSteps, Snapshot, Step
+from Sorting.trace import Trace, TracePlayer, TraceRecorder
+
+# Fewest ints logged between two keyframes, so sorting a few items
+# doesn't snapshot them every step
+KEYFRAME_INTS = 1 << 12
+
+# Most ints of history kept (keyframes and logs), 128 MB
+HISTORY_INTS = 1 << 25
+
+
+class Keyframe:
+    """
+    The state of a SortSteps at one step, and the steps it took from
+    there up to the next keyframe
+
+    ==== Public Attributes ====
+    snapshot: The state of the SortSteps
+    log: The steps taken since; its items are in <snapshot>
+    """
+
+    snapshot: Snapshot
+    log: Trace
+
+    def __init__(self, data: SortSteps) -> None:
+        """ Initializes a Keyframe of <data> as of now """
+        self.snapshot = data.snapshot()
+        self.log = Trace(data.get_title(), [])
+
+    def size(self) -> int:
+        """ Return the number of ints the keyframe holds """
+        return len(self.snapshot.items) + self.logged()
+
+    def logged(self) -> int:
+        """ Return the number of ints of its log """
+        # Steps are 8 byte ints
+        return len(self.log.ops) + len(self.log.values) + \
+            2 * len(self.log.steps)
+
+
+class Replay(TracePlayer):
+    """
+    Plays the history from a keyframe on, through the keyframes after
+    it, without running the algorithm
+
+    ==== Private Attributes ====
+    _keyframes: The keyframes played, the first one starting it
+    """
+
+    _keyframes: List[Keyframe]
+
+    def __init__(self, keyframes: List[Keyframe]) -> None:
+        self._keyframes = keyframes
+        super().__init__(keyframes[0].log)
+        self.restore(keyframes[0].snapshot)
+
+    def _sort(self, items: array) -> Iterator[Step]:
+        for keyframe in self._keyframes:
+            # Blocks take their items from the log of their keyframe
+            self._trace = keyframe.log
+            self._taken = 0
+            ops = keyframe.log.ops
+            start = 0
+            for end in keyframe.log.steps:
+                yield tuple(ops[start * 3:end * 3])
+                start = end
+
+
+class Timeline:
+    """
+    The history of a SortSteps as it plays, to go back to any step of
+    it. Steps are recorded through the <trace> attribute of the
+    SortSteps, and passed on to the recorder it had, if any
+
+    ==== Public Attributes ====
+    data: The sorting algorithm, always at the latest step played
+    view: What is shown: <data> at the latest step, or a replay of the
+          history at an earlier one
+    keyframes: The history kept, oldest first
+
+    ==== Private Attributes ====
+    _recorder: Records the steps into the log of the last keyframe
+    _outer: The recorder <data> had before, if any
+    _size: The number of ints held by every keyframe but the last
+    """
+
+    data: SortSteps
+    view: SortSteps
+    keyframes: List[Keyframe]
+    _recorder: TraceRecorder
+    _outer: Optional[TraceRecorder]
+    _size: int
+
+    def __init__(self, data: SortSteps) -> None:
+        """ Initializes a Timeline recording <data> from now on """
+        self.data = data
+        self.view = data
+        self.keyframes = [Keyframe(data)]
+        self._recorder = TraceRecorder(self.keyframes[0].log)
+        self._outer = data.trace
+        self._size = 0
+        # Only passed through the timeline when there is another to tell
+        data.trace = self._recorder if self._outer is None else self
+
+    @property
+    def first(self) -> int:
+        """ The earliest step that can be gone back to """
+        return self.keyframes[0].snapshot.step
+
+    @property
+    def last(self) -> int:
+        """ The latest step played """
+        return self.data.step
+
+    def step(self, ops: Step, items) -> None:
+        """ Record a step of <data> made of <ops>, which left <items> """
+        self._recorder.step(ops, items)
+        if self._outer is not None:
+            self._outer.step(ops, items)
+
+    def advance(self, count: int,
+                highlights: Optional[List[Tuple[int, int]]] = None) -> int:
+        """ Play up to <count> steps from the one shown, replaying the
+        history until the latest step and running the algorithm from
+        there, as SortSteps.advance(). Return how many were done """
+        done = 0
+        if self.view is not self.data:
+            done = self.view.advance(min(count, self.last - self.view.step),
+                                     highlights, whole=True)
+            if self.view.step < self.last:
+                return done
+            self.view = self.data
+
+        # In batches ending about where the next keyframe is due, going
+        # by the ints logged per step so far
+        due = max(len(self.data.items), KEYFRAME_INTS)
+        while done < count:
+            keyframe = self.keyframes[-1]
+            logged = keyframe.logged()
+            batch = max(1, (due - logged) * len(keyframe.log.steps) //
+                        max(1, logged))
+            steps = self.data.advance(min(count - done, batch), highlights)
+            if not steps:
+                break
+            done += steps
+            if keyframe.logged() >= due:
+                self._keyframe()
+        return done
+
+    def seek(self, step: int) -> None:
+        """ Show the items as they were after <step> steps, or as close
+        to it as the history goes """
+        step = max(self.first, min(step, self.last))
+        if step == self.last:
+            self.view = self.data
+            return
+
+        k = bisect_right([keyframe.snapshot.step
+                          for keyframe in self.keyframes], step) - 1
+        view = self.view
+        # Going forward within the segment, or into the next, is
+        # quicker than starting again from a keyframe
+        if view is self.data or view.step > step or \
+                self.keyframes[k].snapshot.step > view.step:
+            view = Replay(self.keyframes[k:])
+        view.advance(step - view.step, whole=True)
+        self.view = view
+
+    def _keyframe(self) -> None:
+        """ Start a new segment of the history from the latest step,
+        dropping the oldest ones over HISTORY_INTS """
+        self._size += self.keyframes[-1].size()
+        self.keyframes.append(Keyframe(self.data))
+        self._recorder.trace = self.keyframes[-1].log
+        while self._size > HISTORY_INTS and len(self.keyframes) > 2:
+            self._size -= self.keyframes.pop(0).size()
@@ -0,0 +1,217 @@
+"""
+Recording and replaying sorting algorithms as compact traces.
+
+A trace is every step a SortSteps made, its operations (comparing,
+swapping, moving or writing items, blocks and counts) packed into flat
+integer arrays together with where each step ends, and the items every
+block took. Recording runs the algorithm
+headlessly as fast as it goes; playing a trace back applies the
+operations to the starting items, so the renderer can show it without
+running the algorithm again.
+
+    $ python -m Sorting.trace record "Bubble Sort" bubble.trace --size 200
+    $ python -m Sorting.trace play bubble.trace
+"""
+
+import json
+import random
+import sys
+from array import array
+from typing import Iterator, List
+
+from visual_helpers import *
+from Sorting.sort_functions import BLOCK, CYCLE, SortSteps, Step
+
+# First line of a trace file
+MAGIC = b"ALGROW-TRACE 1\n"
+
+
+class Trace:
+    """
+    A recorded run of a sorting algorithm
+
+    ==== Public Attributes ====
+    title: The name of the algorithm, as its get_title()
+    items: The items before sorting
+    ops: The operations of every step, three ints each as in a Step
+    steps: For every step, the number of operations done by its end
+    values: The items taken by every block, one after the other
+    cycle: The algorithm's cycle count once finished
+    """
+
+    title: str
+    items: array
+    ops: array
+    steps: array
+    values: array
+    cycle: int
+
+    def __init__(self, title: str, items: List[int]) -> None:
+        """ Initializes an empty Trace of sorting <items> """
+        self.title = title
+        self.items = array('i', items)
+        self.ops = array('i')
+        self.steps = array('q')
+        self.values = array('i')
+        self.cycle = 0
+
+    def __len__(self) -> int:
+        """ Return the number of steps in the trace """
+        return len(self.steps)
+
+    def save(self, path: str) -> None:
+        """ Write the trace to the file at <path> """
+        header = {"title": self.title, "cycle": self.cycle,
+                  "items": len(self.items), "ops": len(self.ops),
+                  "steps": len(self.steps), "values": len(self.values)}
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(json.dumps(header).encode() + b"\n")
+            self.items.tofile(f)
+            self.ops.tofile(f)
+            self.steps.tofile(f)
+            self.values.tofile(f)
+
+    @staticmethod
+    def load(path: str) -> 'Trace':
+        """ Return the trace in the file at <path> """
+        with open(path, "rb") as f:
+            if f.readline() != MAGIC:
+                raise ValueError(path + " is not an Algrow trace")
+            header = json.loads(f.readline())
+            trace = Trace(header["title"], [])
+            trace.cycle = header["cycle"]
+            trace.items.fromfile(f, header["items"])
+            trace.ops.fromfile(f, header["ops"])
+            trace.steps.fromfile(f, header["steps"])
+            # Traces from before blocks have none
+            trace.values.fromfile(f, header.get("values", 0))
+        return trace
+
+
+class TraceRecorder:
+    """
+    Collects the steps of a SortSteps into a Trace, through its <trace>
+    attribute
+
+    ==== Public Attributes ====
+    trace: The trace being recorded
+    """
+
+    trace: Trace
+
+    def __init__(self, trace: Trace) -> None:
+        self.trace = trace
+
+    def step(self, ops: Step, items: array) -> None:
+        """ Record a step made of <ops>, which left <items> """
+        # Most steps have no 5 anywhere, so no block
+        if BLOCK in ops and BLOCK in ops[::3]:
+            triples = iter(ops)
+            for op, a, b in zip(triples, triples, triples):
+                if op == BLOCK:
+                    self.trace.values.extend(items[a:b])
+        self.trace.ops.extend(ops)
+        self.trace.steps.append(len(self.trace.ops) // 3)
+
+
+def record(steps: type, items: List[int]) -> Trace:
+    """ Sort <items> (left untouched) with the SortSteps subclass
+    <steps> to the end and return the trace of it """
+    data = steps(list(items))
+    trace = Trace(data.get_title(), items)
+    recorder = TraceRecorder(trace)
+    data.trace = recorder
+    data.advance(sys.maxsize)
+    trace.cycle = data.cycle
+    return trace
+
+
+class TracePlayer(SortSteps):
+    """
+    Plays a Trace back as a SortSteps whose steps are the recorded ones,
+    without running the algorithm
+
+    ==== Private Attributes ====
+    _trace: The trace being played
+    _taken: The number of the trace's values blocks took so far
+    """
+
+    _trace: Trace
+    _taken: int
+
+    def __init__(self, trace: Trace) -> None:
+        self._trace = trace
+        self._taken = 0
+        super().__init__(trace.items)
+
+    def _sort(self, items: array) -> Iterator[Step]:
+        ops = self._trace.ops
+        steps = self._trace.steps
+        start = 0
+        for i, end in enumerate(steps):
+            step = tuple(ops[start * 3:end * 3])
+            # Traces store the final cycle even if the steps don't
+            if i == len(steps) - 1:
+                step += (CYCLE, self._trace.cycle, 0)
+            yield step
+            start = end
+
+    def _block(self, start: int, stop: int) -> None:
+        # The items the block took when recorded
+        taken = self._taken
+        self._take(start, stop, self._trace.values[taken:
+                                                   taken + stop - start])
+        self._taken = taken + stop - start
+
+    def complete(self) -> bool:
+        # The trace holds the steps the algorithm took, even past where
+        # the items shown are in order (see ExternalSteps)
+        return self._finished
+
+    def get_title(self) -> str:
+        return self._trace.title
+
+
+if __name__ == "__main__":
+    import argparse
+    import pygame as pg
+    from display import Display
+    from registry import SORTING, load_catalogs
+    from scene_manager import SceneManager
+    from Sorting.sort_visual import WORKLOADS, SortScene, sort_items
+
+    parser = argparse.ArgumentParser(description="Record or play a "
+                                     "sorting algorithm trace")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rec = commands.add_parser("record", help="sort and save the trace")
+    rec.add_argument("algorithm", help='e.g. "Bubble Sort"')
+    rec.add_argument("path")
+    rec.add_argument("--size", type=int, default=35)
+    rec.add_argument("--seed", type=int, default=0)
+    rec.add_argument("--workload", default="Shuffled", choices=WORKLOADS)
+    play = commands.add_parser("play", help="show a saved trace")
+    play.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        load_catalogs()
+        entries = [e for e in SORTING
+                   if args.algorithm.lower() in (e.label.lower(),
+                                                 e.attr.lower())]
+        if not entries:
+            parser.error("no sorting algorithm called " + args.algorithm)
+        items = sort_items(args.size, random.Random(args.seed),
+                           args.workload)
+        trace = record(entries[0].load(), items)
+        trace.save(args.path)
+        print("Recorded %d steps, %d operations"
+              % (len(trace), len(trace.ops) // 3))
+    else:
+        pg.init()
+        pg.display.set_caption('Algrow')
+        display = Display((WIDTH, HEIGHT))
+        manager = SceneManager(display.surface)
+        manager.push(SortScene(manager, TracePlayer(Trace.load(args.path))))
+        manager.run()
+        pg.quit()
@@ -0,0 +1,369 @@
+"""
+Non-comparison sorting classes for the sorting visualiser, whose passes
+run as numpy operations over the whole array, so they stay linear time
+on millions of items. Currently implemented:
+CountingSort, LSD and MSD RadixSort, BucketSort, and the sorting
+networks BitonicSort, OddEvenMergeSort and OddEvenTranspositionSort
+
+Unlike the ones in Sorting.sort_functions, every algorithm is a
+generator sorting its own copy of the items, a numpy array, and steps
+don't say how each item moved. A step is a pass
+(or one bucket of a pass): the block of the array it rearranged, which
+SortSteps copies over in one go instead of item by item. Blocks only
+ever rearrange the items in them, so the items shown are always all
+there. The items a step writes, and the comparisons it makes, are
+counted in the step as a whole; comparisons numpy makes sorting small
+buckets of MSD radix and bucket sort are its own and not counted.
+
+Needs numpy, the catalog only offers these when it is installed.
+"""
+
+from array import array
+from typing import Iterator, Tuple
+
+import numpy as np
+
+from Sorting.sort_functions import BLOCK, COMPARE, COUNT, CYCLE, SortSteps, \
+    Step
+
+# Bits of a key sorted on in one radix pass (16 buckets)
+RADIX_BITS = 4
+RADIX = 1 << RADIX_BITS
+
+# MSD radix sort: buckets this small are sorted outright, in the same
+# step as the split making them, instead of split by the next digit
+MSD_SMALL = 16
+
+# Bucket sort: items per bucket, and at most this many buckets
+BUCKET_ITEMS = 4
+MAX_BUCKETS = 1024
+
+# Sorting networks: layers of more compare-exchanges than this only
+# highlight their ends, drawing every pair would cost more than the layer
+HIGHLIGHT_PAIRS = 512
+
+
+class VectorSteps(SortSteps):
+    """
+    A sorting algorithm over a numpy array, whose steps are blocks.
+    Subclasses write the algorithm as _passes()
+
+    ==== Private Attributes ====
+    _source: the algorithm's own array, blocks are copied from it
+    """
+    _source: np.ndarray
+
+    vectorised = True
+
+    def _sort(self, items: array) -> Iterator[Step]:
+        self._source = np.array(items, dtype=np.intc)
+        return self._passes(self._source)
+
+    def _passes(self, items: np.ndarray) -> Iterator[Step]:
+        """Sort <items>, yielding every block rearranged after doing it"""
+        raise NotImplementedError
+
+    def _block(self, start: int, stop: int) -> None:
+        self._take(start, stop, self._source[start:stop])
+
+
+def _keys(items: np.ndarray) -> np.ndarray:
+    """Return <items> less the smallest, as the unsigned keys sorted on"""
+    return (items.astype(np.int64) - items.min()).astype(np.uint64)
+
+
+def _digits(keys: np.ndarray, shift: int) -> np.ndarray:
+    """Return the digit of every key in <keys> <shift> bits up, small
+    enough for numpy's stable sort to be a radix sort"""
+    return ((keys >> np.uint64(shift)) & np.uint64(RADIX - 1)).astype(np.uint8)
+
+
+def _top_shift(keys: np.ndarray) -> int:
+    """Return how many bits up the most significant digit of <keys> is"""
+    bits = int(keys.max()).bit_length()
+    return max(0, (bits - 1) // RADIX_BITS * RADIX_BITS)
+
+
+class CountingSteps(VectorSteps):
+    """
+    Counting sort: counts every value, then writes the output straight
+    from the counts, one step per sixteenth of the range of values. The
+    items still to place are kept after the output, in input order, only
+    to show them: counting sort writes every item once, so only the
+    output is counted as written. The cycle is the number of ranges
+    written
+    """
+
+    def _passes(self, items: np.ndarray) -> Iterator[Step]:
+        n = len(items)
+        if n < 2:
+            return
+        low = int(items.min())
+        counts = np.bincount(items - low)
+        ends = np.cumsum(counts)
+        span = len(counts)
+
+        start = 0
+        for cycle in range(1, RADIX + 1):
+            top = span * cycle // RADIX
+            stop = int(ends[top - 1]) if top else 0
+            if stop == start:
+                continue
+            rest = items[start:]
+            rest = rest[rest >= low + top]
+            items[start:stop] = np.repeat(
+                np.arange(low + span * (cycle - 1) // RADIX, low + top,
+                          dtype=np.intc),
+                counts[span * (cycle - 1) // RADIX:top])
+            items[stop:] = rest
+            yield BLOCK, start, n, COUNT, 0, stop - start, CYCLE, cycle, 0
+            start = stop
+
+    def get_title(self) -> str:
+        return "Counting"
+
+
+class LsdRadixSteps(VectorSteps):
+    """
+    Least significant digit radix sort: stably sorts the whole array by
+    each digit of four bits in turn, from the lowest up, one pass a step.
+    The cycle is the number of passes done
+    """
+
+    def _passes(self, items: np.ndarray) -> Iterator[Step]:
+        if len(items) < 2:
+            return
+        keys = _keys(items)
+        for cycle, shift in enumerate(range(0, _top_shift(keys) + 1,
+                                            RADIX_BITS), 1):
+            order = np.argsort(_digits(keys, shift), kind="stable")
+            keys = keys[order]
+            items[:] = items[order]
+            yield BLOCK, 0, len(items), COUNT, 0, len(items), \
+                CYCLE, cycle, 0
+
+    def get_title(self) -> str:
+        return "LSD Radix"
+
+
+class MsdRadixSteps(VectorSteps):
+    """
+    Most significant digit radix sort: splits the array into buckets by
+    its highest digit of four bits, then every bucket by the next digit,
+    one bucket a step. Small buckets are sorted outright as they are
+    made. The cycle is the number of buckets split
+    """
+
+    def _passes(self, items: np.ndarray) -> Iterator[Step]:
+        if len(items) < 2:
+            return
+        keys = _keys(items)
+        # Buckets still to split, as (start, stop, shift of their digit)
+        stack = [(0, len(items), _top_shift(keys))]
+        cycle = 0
+        while stack:
+            lo, hi, shift = stack.pop()
+            cycle += 1
+            if hi - lo <= MSD_SMALL:
+                order = np.argsort(keys[lo:hi], kind="stable")
+            else:
+                digits = _digits(keys[lo:hi], shift)
+                counts = np.bincount(digits, minlength=RADIX)
+                small = counts <= MSD_SMALL
+                if shift and small[digits].any():
+                    # Small buckets are sorted in the same step; the
+                    # keys within a bucket differ only below its digit
+                    inside = np.where(small[digits], keys[lo:hi], 0)
+                    order = np.lexsort((inside, digits))
+                else:
+                    order = np.argsort(digits, kind="stable")
+                if shift:
+                    ends = lo + np.cumsum(counts)
+                    starts = ends - counts
+                    # Pushed backwards, so they're done left to right
+                    stack += [(int(start), int(end), shift - RADIX_BITS)
+                              for start, end in zip(starts[::-1], ends[::-1])
+                              if end - start > MSD_SMALL]
+            keys[lo:hi] = keys[lo:hi][order]
+            items[lo:hi] = items[lo:hi][order]
+            yield BLOCK, lo, hi, COUNT, 0, hi - lo, CYCLE, cycle, 0
+
+    def get_title(self) -> str:
+        return "MSD Radix"
+
+
+class BucketSteps(VectorSteps):
+    """
+    Bucket sort: scatters the items into buckets of equal ranges of
+    values in one step, then sorts every bucket, one a step. The cycle
+    is the number of buckets sorted
+    """
+
+    def _passes(self, items: np.ndarray) -> Iterator[Step]:
+        n = len(items)
+        if n < 2:
+            return
+        keys = _keys(items).astype(np.int64)
+        buckets = max(1, min(n // BUCKET_ITEMS, MAX_BUCKETS))
+        which = (keys * buckets // (int(keys.max()) + 1)).astype(np.uint16)
+        order = np.argsort(which, kind="stable")
+        items[:] = items[order]
+        yield BLOCK, 0, n, COUNT, 0, n
+
+        ends = np.cumsum(np.bincount(which, minlength=buckets))
+        starts = np.concatenate(([0], ends[:-1]))
+        cycle = 0
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            if end - start > 1:
+                cycle += 1
+                items[start:end] = np.sort(items[start:end])
+                yield BLOCK, start, end, COUNT, 0, end - start, \
+                    CYCLE, cycle, 0
+
+    def get_title(self) -> str:
+        return "Bucket"
+
+
+class NetworkSteps(VectorSteps):
+    """
+    A sorting network: fixed layers of compare-exchanges, independent
+    of the items and of each other within a layer, so a layer is done
+    in one go. One layer is a step, all of its pairs highlighted, and
+    the number of steps is the depth of the network. A compare-exchange
+    is a comparison and two writes, the smaller item and the larger.
+    Subclasses list the layers as _layers()
+    """
+
+    def _sort(self, items: array) -> Iterator[Step]:
+        # Networks for powers of two sort fewer items padded with the
+        # largest item there can be: every pair puts the smaller item
+        # first, so the padding never moves
+        self._source = np.full(self._size(len(items)),
+                               np.iinfo(np.intc).max, dtype=np.intc)
+        self._source[:len(items)] = items
+        return self._passes(self._source)
+
+    def _size(self, n: int) -> int:
+        """Return the number of items the network sorting <n> has"""
+        return 1 << max(0, n - 1).bit_length()
+
+    def _passes(self, items: np.ndarray) -> Iterator[Step]:
+        n = len(self.items)
+        # The same layers over the indices, to tell which pairs they are
+        index = np.arange(len(items))
+        for (cycle, first, second), (_, at, to) in \
+                zip(self._layers(items), self._layers(index)):
+            # Rows of the views are successive blocks of the items, the
+            # first holding the lowest indices and the last the highest.
+            # Layers with no pairs (of too few items) or only pairs in
+            # the padding do nothing
+            if not to.size or int(to[0].min()) >= n:
+                continue
+            low = np.minimum(first, second)
+            np.maximum(first, second, out=second)
+            first[...] = low
+
+            # Pairs with the padding compare nothing
+            pairs = to.size if int(to.max()) < n else \
+                int(np.count_nonzero(to < n))
+            ops = (BLOCK, int(at[0].min()), min(int(to[-1].max()) + 1, n))
+            if to.size <= HIGHLIGHT_PAIRS:
+                inside = to < n
+                ops += tuple(np.column_stack(
+                    (np.full(pairs, COMPARE),
+                     at[inside], to[inside])).ravel().tolist())
+                ops += (COUNT, 0, 2 * pairs)
+            else:
+                ops += (COUNT, pairs, 2 * pairs)
+            yield ops + (CYCLE, cycle, 0)
+
+    def _layers(self, items: np.ndarray) -> \
+            Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+        """Yield every layer of the network sorting <items> as the cycle
+        it is in, and views of the lower and higher item of each of its
+        pairs"""
+        raise NotImplementedError
+
+
+class BitonicSteps(NetworkSteps):
+    """
+    Bitonic sort: merges sorted blocks of 1, 2, 4... items pairwise,
+    comparing the first block with the second one reversed and then
+    halving the distance between the pairs. The cycle is the size of
+    the blocks being merged, as a power of two
+    """
+
+    def _layers(self, items: np.ndarray) -> \
+            Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+        block = 2
+        cycle = 1
+        while block <= len(items):
+            half = block // 2
+            blocks = items.reshape(-1, block)
+            yield cycle, blocks[:, :half], blocks[:, ::-1][:, :half]
+            distance = block // 4
+            while distance:
+                pairs = items.reshape(-1, 2 * distance)
+                yield cycle, pairs[:, :distance], pairs[:, distance:]
+                distance //= 2
+            block *= 2
+            cycle += 1
+
+    def get_title(self) -> str:
+        return "Bitonic"
+
+
+class OddEvenMergeSteps(NetworkSteps):
+    """
+    Batcher's odd-even merge sort: merges sorted blocks of 1, 2, 4...
+    items pairwise by merging their odd and even items, then comparing
+    neighbours of the two. The cycle is the size of the blocks being
+    merged, as a power of two
+    """
+
+    def _layers(self, items: np.ndarray) -> \
+            Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+        block = 1
+        cycle = 1
+        while block < len(items):
+            merged = items.reshape(-1, 2 * block)
+            yield cycle, merged[:, :block], merged[:, block:]
+            distance = block // 2
+            while distance:
+                # Past the first <distance> items of the merged blocks,
+                # pairs <distance> apart in groups of 2 * <distance>
+                groups = merged[:, distance:-distance].reshape(
+                    len(merged), -1, 2 * distance)
+                yield cycle, groups[..., :distance], groups[..., distance:]
+                distance //= 2
+            block *= 2
+            cycle += 1
+
+    def get_title(self) -> str:
+        return "Odd-Even Merge"
+
+
+class TranspositionSteps(NetworkSteps):
+    """
+    Odd-even transposition sort: bubble sort's comparisons of
+    neighbours, every other pair at once, alternating between the pairs
+    starting at even and at odd indices; n layers are enough. The cycle
+    is the number of layers done
+    """
+
+    # n layers of n / 2 pairs, quadratic however they run
+    vectorised = False
+
+    def _size(self, n: int) -> int:
+        return n
+
+    def _layers(self, items: np.ndarray) -> \
+            Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+        n = len(items)
+        for cycle in range(1, n + 1):
+            start = (cycle - 1) % 2
+            pairs = items[start:start + (n - start) // 2 * 2].reshape(-1, 2)
+            yield cycle, pairs[:, 0], pairs[:, 1]
+
+    def get_title(self) -> str:
+        return "Odd-Even Transposition"
@@ -0,0 +1,241 @@
+"""
+Headless benchmarks of Algrow's algorithms.
+
+Every sorting stepper in the menu is run to completion on shuffled
+inputs of a few sizes (the vectorised ones on millions of items too)
+and on the other inputs offered (nearly sorted, reversed...) of one
+size, the external merge sort on files of random items, A* on a set of
+standard mazes and the Sudoku backtracking solver on its board, with
+nothing drawn. Steps per second and total time of
+each go to a JSON file, which can be compared with a stored baseline to
+catch regressions.
+
+    $ python benchmark.py --output results.json
+    $ python benchmark.py --baseline results.json
+"""
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import pygame as pg
+from importlib.util import find_spec
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from registry import SORTING, load_catalogs
+
+# Input sizes the sorting steppers are run on
+SORT_SIZES = [16, 64, 256, 1024]
+
+# Input sizes only the vectorised sorting steppers are run on too
+VECTOR_SIZES = [1 << 16, 1 << 20]
+
+# Input size the sorting steppers are run on for every other workload
+# than shuffled
+WORKLOAD_SIZE = 256
+
+# Files the external merge sort is run on, as (items, items held in
+# memory): one merge pass, and two
+EXTERNAL = [(1 << 22, 1 << 18), (1 << 22, 1 << 16)]
+
+# The standard mazes A* is run on, as (seed, obstacle density)
+MAZES = [(0, 0.0), (1, 0.2), (2, 0.2), (3, 0.3), (4, 0.3)]
+
+# How many times each benchmark is measured, the fastest counting
+REPEAT = 3
+
+# Shortest time (seconds) one measurement takes: quick benchmarks are
+# run again and again until it has passed
+MIN_TIME = 0.2
+
+# How much slower than the baseline (as a fraction) is a regression
+TOLERANCE = 0.25
+
+# A benchmark: sets up a run and returns a function doing it, which
+# returns the number of steps taken
+Benchmark = Callable[[], Callable[[], int]]
+
+
+def sort_benchmark(stepper: type, size: int,
+                   workload: Optional[str] = None) -> Benchmark:
+    """ Return a benchmark sorting <size> shuffled items with <stepper>,
+    or items arranged as <workload> """
+    def setup() -> Callable[[], int]:
+        if workload is None:
+            items = list(range(1, size + 1))
+            random.Random(size).shuffle(items)
+        else:
+            from Sorting.sort_visual import sort_items
+            items = sort_items(size, random.Random(size), workload)
+        data = stepper(items)
+
+        def run() -> int:
+            data.advance(sys.maxsize)
+            return data.step
+        return run
+    return setup
+
+
+def external_benchmark(size: int, memory: int) -> Benchmark:
+    """ Return a benchmark sorting a file of <size> random items out of
+    core, holding <memory> of them in memory, where a run formed or a
+    round of a merge is a step """
+    def setup() -> Callable[[], int]:
+        import numpy as np
+        from Sorting.external import DTYPE, ExternalSort
+        directory = tempfile.mkdtemp(prefix="algrow-")
+        source = os.path.join(directory, "items.bin")
+        np.random.default_rng(size).integers(0, 1 << 31, size,
+                                             DTYPE).tofile(source)
+        sort = ExternalSort(source, os.path.join(directory, "sorted.bin"),
+                            memory)
+
+        def run() -> int:
+            try:
+                return sum(1 for _ in sort.passes())
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+        return run
+    return setup
+
+
+def event_benchmark(events: Callable[[], Iterator[tuple]],
+                    step: int) -> Benchmark:
+    """ Return a benchmark running the algorithm <events> builds, where
+    an event of kind <step> is a step """
+    def setup() -> Callable[[], int]:
+        algorithm = events()
+
+        def run() -> int:
+            return sum(1 for event in algorithm if event[0] == step)
+        return run
+    return setup
+
+
+def benchmarks() -> Dict[str, Benchmark]:
+    """ Return every benchmark by name """
+    from Searching.astar_visual import SELECT, sample_maze
+    from Searching.sudoku_visual import GUESS, SudokuBoard
+    from Sorting.sort_visual import WORKLOADS
+
+    load_catalogs()
+    cases = {}
+    for entry in SORTING:
+        stepper = entry.load()
+        sizes = SORT_SIZES + VECTOR_SIZES if stepper.vectorised else SORT_SIZES
+        for size in sizes:
+            cases["sort/%s/%d" % (entry.attr, size)] = \
+                sort_benchmark(stepper, size)
+        for workload in WORKLOADS:
+            if workload != "Shuffled":
+                cases["sort/%s/%s-%d" % (entry.attr,
+                                         workload.lower().replace(" ", "-"),
+                                         WORKLOAD_SIZE)] = \
+                    sort_benchmark(stepper, WORKLOAD_SIZE, workload)
+
+    if find_spec("numpy") is not None:
+        for size, memory in EXTERNAL:
+            cases["external/%d-memory%d" % (size, memory)] = \
+                external_benchmark(size, memory)
+
+    for seed, density in MAZES:
+        cases["astar/seed%d-density%.1f" % (seed, density)] = \
+            event_benchmark(lambda seed=seed, density=density:
+                            sample_maze(seed, density).astar_steps(), SELECT)
+
+    cases["sudoku/backtracking"] = \
+        event_benchmark(lambda: SudokuBoard().solve(), GUESS)
+    return cases
+
+
+def measure(setup: Benchmark, repeat=REPEAT) -> Dict[str, float]:
+    """ Measure the benchmark <setup> <repeat> times and return the
+    steps and time of one run, from the fastest measurement """
+    best = None
+    steps = 0
+    for _ in range(repeat):
+        runs, elapsed = 0, 0.0
+        while runs == 0 or elapsed < MIN_TIME:
+            run = setup()
+            start = time.perf_counter()
+            steps = run()
+            elapsed += time.perf_counter() - start
+            runs += 1
+        if best is None or elapsed / runs < best:
+            best = elapsed / runs
+    return {"steps": steps, "seconds": best,
+            "steps_per_s": steps / best if best else 0.0}
+
+
+def run_benchmarks(pattern="", repeat=REPEAT) -> dict:
+    """ Run every benchmark whose name contains <pattern> and return
+    the report """
+    pg.init()
+    results = {}
+    for name, setup in benchmarks().items():
+        if pattern in name:
+            results[name] = measure(setup, repeat)
+            print("%-40s %9d steps %10.4f s %12.0f steps/s" %
+                  (name, results[name]["steps"], results[name]["seconds"],
+                   results[name]["steps_per_s"]))
+    pg.quit()
+    return {"meta": {"python": platform.python_version(),
+                     "pygame": pg.version.ver,
+                     "platform": platform.platform(),
+                     "repeat": repeat},
+            "results": results}
+
+
+def compare(report: dict, baseline: dict,
+            tolerance=TOLERANCE) -> List[Tuple[str, str]]:
+    """ Return the benchmarks of <report> that regressed from
+    <baseline>, with what went wrong """
+    problems = []
+    for name, result in report["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        if result["steps"] != old["steps"]:
+            problems.append((name, "took %d steps, was %d"
+                             % (result["steps"], old["steps"])))
+        if result["steps_per_s"] < old["steps_per_s"] * (1 - tolerance):
+            problems.append((name, "%.0f steps/s, was %.0f"
+                             % (result["steps_per_s"], old["steps_per_s"])))
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Algrow's "
+                                     "algorithms headlessly")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results to compare with; "
+                                           "exits with 1 on a regression")
+    parser.add_argument("--only", default="",
+                        help="only run benchmarks whose name contains this")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="slowdown (fraction) counted as a regression")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.only, args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(report, json.load(f), args.tolerance)
+        for name, problem in problems:
+            print("REGRESSION %s: %s" % (name, problem))
+        if problems:
+            sys.exit(1)
+        print("No regressions against " + args.baseline)
@@ -0,0 +1,202 @@
+"""
+The window Algrow is shown in.
+
+Everything is drawn on a fixed size logical surface, which is only
+scaled to the (resizable) window when it is presented. Layout and
+drawing never depend on the window size.
+"""
+
+import time
+import math
+import pygame as pg
+from typing import List, Optional, Tuple
+
+from profiler import PROFILER
+
+# Color of the bars around the picture when the window's aspect
+# ratio differs from the logical surface's
+LETTERBOX = (0, 0, 0)
+
+
+class Display:
+    """
+    A resizable window showing a fixed size logical surface
+
+    ==== Public Attributes ====
+    surface: The fixed size logical surface everything draws on
+    window: The window's own surface
+    overlay: Drawn over the top-left corner of the picture in the
+             window, not on the logical surface (e.g. the profiler HUD)
+
+    ==== Private Attributes ====
+    _scale: Window pixels per logical pixel
+    _target: Where the logical surface lands in the window
+    _scaled: Buffer holding the scaled picture, None at 1:1. Presents
+             scale into it, never into new surfaces
+    """
+
+    surface: pg.Surface
+    window: pg.Surface
+    overlay: Optional[pg.Surface]
+    _scale: float
+    _target: pg.Rect
+    _scaled: Optional[pg.Surface]
+
+    def __init__(self, logical: Tuple[int, int],
+                 size: Optional[Tuple[int, int]] = None) -> None:
+        """ Opens a window of <size> (by default <logical>) showing a
+        <logical> sized surface, and makes it the current Display """
+        global _display
+
+        self.window = pg.display.set_mode(size or logical, pg.RESIZABLE)
+        self.surface = pg.Surface(logical)
+        self.overlay = None
+        self._fit()
+        _display = self
+
+    def _fit(self) -> None:
+        """ Work out where and how big the picture goes in the window.
+        Only done when the window changes size """
+        width, height = self.surface.get_size()
+        win_w, win_h = self.window.get_size()
+        self._scale = min(win_w / width, win_h / height)
+
+        size = (max(1, int(width * self._scale)),
+                max(1, int(height * self._scale)))
+        self._target = pg.Rect((0, 0), size)
+        self._target.center = (win_w // 2, win_h // 2)
+
+        if size == (width, height):
+            self._scaled = None
+        else:
+            self._scaled = pg.Surface(size)
+        self.window.fill(LETTERBOX)
+
+    def resize(self) -> None:
+        """ Adapt to the window's new size and show everything again """
+        self.window = pg.display.get_surface()
+        self._fit()
+        self.present()
+
+    def present(self, rects: Optional[List[pg.Rect]] = None) -> None:
+        """ Show <rects> of the logical surface in the window, or all of
+        it if <rects> is None """
+        global _first_frame
+        if _first_frame is None:
+            _first_frame = time.perf_counter()
+
+        if rects is None:
+            if self._scaled is None:
+                self.window.blit(self.surface, self._target)
+            else:
+                pg.transform.scale(self.surface, self._target.size,
+                                   self._scaled)
+                self.window.blit(self._scaled, self._target)
+            if self.overlay is not None:
+                self.window.blit(self.overlay, self._target)
+            pg.display.flip()
+            return
+
+        # Whatever the overlay covers is put back before drawing it again
+        if self.overlay is not None:
+            rects = list(rects) + [self._covered()]
+
+        bounds = self.surface.get_rect()
+        dirty = []
+        for rect in rects:
+            rect = pg.Rect(rect).clip(bounds)
+            if not rect.w or not rect.h:
+                continue
+            if self._scaled is None:
+                dest = rect.move(self._target.topleft)
+                self.window.blit(self.surface, dest, rect)
+            else:
+                dest = self._to_window(rect)
+                if not dest.w or not dest.h:
+                    continue
+                # Into the same place in the buffer as in the window
+                part = dest.move(-self._target.x, -self._target.y)
+                pg.transform.scale(self.surface.subsurface(rect), dest.size,
+                                   self._scaled.subsurface(part))
+                self.window.blit(self._scaled, dest, part)
+            dirty.append(dest)
+
+        if self.overlay is not None:
+            dirty.append(self.window.blit(self.overlay, self._target))
+
+        if dirty:
+            pg.display.update(dirty)
+
+    def set_overlay(self, overlay: Optional[pg.Surface]) -> None:
+        """ Show <overlay> over the picture (None to remove it), putting
+        back what the previous one covered """
+        covered = []
+        if self.overlay is not None:
+            covered.append(self._covered())
+        self.overlay = overlay
+        self.present(covered)
+
+    def _covered(self) -> pg.Rect:
+        """ Return the part of the logical surface under the overlay """
+        width, height = self.overlay.get_size()
+        return pg.Rect(0, 0, math.ceil(width / self._scale) + 1,
+                       math.ceil(height / self._scale) + 1)
+
+    def _to_window(self, rect: pg.Rect) -> pg.Rect:
+        """ Return where <rect> of the logical surface is in the window """
+        left = int(rect.left * self._scale)
+        top = int(rect.top * self._scale)
+        right = int(rect.right * self._scale)
+        bottom = int(rect.bottom * self._scale)
+        return pg.Rect(self._target.x + left, self._target.y + top,
+                       right - left, bottom - top)
+
+    def to_logical(self, pos: Tuple[int, int]) -> Tuple[int, int]:
+        """ Return the point of the logical surface under window
+        position <pos> """
+        return (int((pos[0] - self._target.x) / self._scale),
+                int((pos[1] - self._target.y) / self._scale))
+
+
+# The Display everything is presented on, set by Display()
+_display: Optional[Display] = None
+
+# When (time.perf_counter) the first frame was presented
+_first_frame: Optional[float] = None
+
+
+def present(rects: Optional[List[pg.Rect]] = None) -> None:
+    """ Show <rects> (or everything) drawn on the logical surface """
+    if _display is not None:
+        with PROFILER.phase("present"):
+            _display.present(rects)
+
+
+def set_overlay(overlay: Optional[pg.Surface]) -> None:
+    """ Show <overlay> over the current Display (None to remove it) """
+    if _display is not None:
+        _display.set_overlay(overlay)
+
+
+def first_frame_time() -> Optional[float]:
+    """ Return when (time.perf_counter) the first frame was presented,
+    None if none was yet """
+    return _first_frame
+
+
+def resize() -> None:
+    """ Adapt the current Display to its window's new size """
+    if _display is not None:
+        _display.resize()
+
+
+def to_logical(pos: Tuple[int, int]) -> Tuple[int, int]:
+    """ Return the logical position under window position <pos> """
+    if _display is None:
+        return pos
+    return _display.to_logical(pos)
+
+
+def mouse_pos() -> Tuple[int, int]:
+    """ Return the position of the mouse on the logical surface """
+    return to_logical(pg.mouse.get_pos())
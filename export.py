@@ -0,0 +1,313 @@
+"""
+Headless, faster than realtime export of Algrow's visualisers.
+
+A visualiser is played on an offscreen surface under SDL's dummy video
+driver, advancing by simulated time instead of the wall clock.
+Algorithms running in a worker thread are waited for, so every frame
+shows the same steps and exports are the same on every run. Frames go through a bounded queue to an encoder
+thread: a video or GIF through ffmpeg when it is installed, otherwise
+a directory of PNG frames.
+
+    $ python export.py "Insertion Sort" insertion.gif
+    $ python export.py "A*" astar.mp4 --seed 3 --speed 4
+"""
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import queue
+import random
+import shutil
+import subprocess
+import threading
+import pygame as pg
+from typing import Optional, Tuple
+
+from visual_helpers import HEIGHT, WIDTH
+from registry import SEARCHING, SORTING, Entry, load, load_catalogs
+from scene_manager import HoldScene, Scene, SceneManager
+from scheduler import Scheduler
+
+# Frames held by the queue between the renderer and the encoder
+QUEUE_FRAMES = 64
+
+# Queued instead of a frame identical to the one before it
+REPEAT = b""
+
+# Extensions written through ffmpeg
+VIDEO_FORMATS = [".gif", ".mp4", ".webm", ".mkv"]
+
+
+class FrameEncoder(threading.Thread):
+    """
+    Writes frames in a background thread. Frames wait in a bounded
+    queue, so a fast renderer is held back instead of piling them up
+
+    ==== Public Attributes ====
+    path: Where the frames are written
+    fps: Frames per second of the output
+    size: The size of every frame
+    frames: The number of frames written so far
+
+    ==== Private Attributes ====
+    _queue: The frames (raw RGB bytes) waiting to be written, REPEAT
+            for a frame identical to the one before
+    _last: The last frame queued
+    _error: What stopped the encoder, if anything did
+    """
+
+    path: str
+    fps: int
+    size: Tuple[int, int]
+    frames: int
+    _queue: queue.Queue
+    _last: Optional[bytes]
+    _error: Optional[BaseException]
+
+    def __init__(self, path: str, fps: int, size: Tuple[int, int]) -> None:
+        """ Initializes and starts a FrameEncoder """
+        super().__init__(daemon=True)
+        self.path = path
+        self.fps = fps
+        self.size = size
+        self.frames = 0
+        self._queue = queue.Queue(maxsize=QUEUE_FRAMES)
+        self._last = None
+        self._error = None
+        self.start()
+
+    def put(self, surface: pg.Surface) -> None:
+        """ Queue what is on <surface> as the next frame """
+        frame = pg.image.tobytes(surface, "RGB")
+        if frame == self._last:
+            self._queue.put(REPEAT)
+        else:
+            self._queue.put(frame)
+            self._last = frame
+
+    def close(self) -> None:
+        """ Write the remaining frames and finish the output """
+        self._queue.put(None)
+        self.join()
+        if self._error is not None:
+            raise self._error
+
+    def run(self) -> None:
+        try:
+            self._open()
+        except Exception as error:
+            self._error = error
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            # After a failure frames are still taken off the queue, so
+            # put() never blocks forever; close() raises the error
+            if self._error is not None:
+                continue
+            try:
+                if frame is REPEAT:
+                    self._repeat()
+                else:
+                    self._write(frame)
+                self.frames += 1
+            except Exception as error:
+                self._error = error
+        if self._error is None:
+            self._close()
+
+    def _open(self) -> None:
+        """ Get the output ready """
+        raise NotImplementedError
+
+    def _write(self, frame: bytes) -> None:
+        """ Write one frame """
+        raise NotImplementedError
+
+    def _repeat(self) -> None:
+        """ Write the last frame again """
+        raise NotImplementedError
+
+    def _close(self) -> None:
+        """ Finish the output """
+        raise NotImplementedError
+
+
+class FFmpegEncoder(FrameEncoder):
+    """
+    Pipes raw frames into ffmpeg, which encodes them into <path>
+
+    ==== Private Attributes ====
+    _process: The running ffmpeg
+    _frame: The last frame written
+    """
+
+    _process: subprocess.Popen
+    _frame: bytes
+
+    def _open(self) -> None:
+        command = ["ffmpeg", "-loglevel", "error", "-y",
+                   "-f", "rawvideo", "-pix_fmt", "rgb24",
+                   "-s", "%dx%d" % self.size, "-r", str(self.fps),
+                   "-i", "-"]
+        if self.path.endswith(".gif"):
+            command += ["-vf", "split[a][b];[a]palettegen[p];[b][p]paletteuse"]
+        else:
+            command += ["-pix_fmt", "yuv420p"]
+        self._process = subprocess.Popen(command + [self.path],
+                                         stdin=subprocess.PIPE)
+
+    def _write(self, frame: bytes) -> None:
+        self._process.stdin.write(frame)
+        self._frame = frame
+
+    def _repeat(self) -> None:
+        self._process.stdin.write(self._frame)
+
+    def _close(self) -> None:
+        self._process.stdin.close()
+        self._process.wait()
+
+
+class PNGEncoder(FrameEncoder):
+    """
+    Saves every frame as a numbered PNG in the directory <path>.
+    Repeated frames are links to the first copy, not encoded again
+    """
+
+    def _open(self) -> None:
+        os.makedirs(self.path, exist_ok=True)
+
+    def _frame_file(self, frame: int) -> str:
+        """ Return the file of frame number <frame> """
+        return os.path.join(self.path, "frame_%06d.png" % frame)
+
+    def _write(self, frame: bytes) -> None:
+        surface = pg.image.frombuffer(frame, self.size, "RGB")
+        pg.image.save(surface, self._frame_file(self.frames))
+
+    def _repeat(self) -> None:
+        name = self._frame_file(self.frames)
+        if os.path.exists(name):
+            os.remove(name)
+        try:
+            os.link(self._frame_file(self.frames - 1), name)
+        except OSError:
+            shutil.copyfile(self._frame_file(self.frames - 1), name)
+
+    def _close(self) -> None:
+        pass
+
+
+def open_encoder(path: str, fps: int, size: Tuple[int, int]) -> FrameEncoder:
+    """ Return an encoder writing to <path>: ffmpeg for video and GIF
+    paths if it is installed, otherwise PNG frames """
+    root, ext = os.path.splitext(path)
+    if ext.lower() in VIDEO_FORMATS:
+        if shutil.which("ffmpeg"):
+            return FFmpegEncoder(path, fps, size)
+        print("ffmpeg not found, writing PNG frames to " + root)
+        path = root
+    return PNGEncoder(path, fps, size)
+
+
+def find_entry(name: str) -> Entry:
+    """ Return the visualiser called <name> (its menu label or class
+    name, any case) """
+    load_catalogs()
+    for entry in list(SORTING) + list(SEARCHING):
+        if name.lower() in (entry.label.lower(), entry.attr.lower()):
+            return entry
+    raise ValueError("No visualiser called " + repr(name))
+
+
+def make_scene(manager: SceneManager, entry: Entry, seed: int,
+               size: Optional[int] = None, workload="Shuffled") -> Scene:
+    """ Return the scene playing <entry>, set up to play by itself.
+    Sorting algorithms sort <size> items if given, arranged as
+    <workload> """
+    if entry in SORTING.entries:
+        items = load("Sorting.sort_visual", "sort_items")(
+            size, random.Random(seed), workload)
+        scene = load("Sorting.sort_visual", "SortScene")
+        return scene(manager, entry.load()(items))
+
+    scene = entry.load()(manager)
+    scene.autoplay(seed)
+    return scene
+
+
+def export(name: str, path: str, fps=30, speed=1.0, seed=0,
+           holds=True, max_frames: Optional[int] = None,
+           size: Optional[int] = None, workload="Shuffled") -> int:
+    """ Play the visualiser <name> offscreen and write it to <path> at
+    <fps>, <speed> times faster than in the app. With <holds>, the
+    screens shown after it finishes are included. Sorting algorithms
+    sort <size> items if given, arranged as <workload>. Return the
+    number of frames written """
+    pg.init()
+    surface = pg.Surface((WIDTH, HEIGHT))
+    manager = SceneManager(surface)
+    scene = make_scene(manager, find_entry(name), seed, size, workload)
+    manager.push(scene)
+
+    encoder = open_encoder(path, fps, (WIDTH, HEIGHT))
+    frame_time = 1000 / fps
+    count = 0
+
+    # The visualiser itself, on simulated time
+    scheduler = Scheduler(scene.rate, fps)
+    scheduler.speed = speed
+    scene.enter()
+    while manager.top is scene and (max_frames is None or count < max_frames):
+        scene.update(scheduler.advance(frame_time))
+        # Even once finished, the steps it just took are shown: at high
+        # speeds its first update can be its last
+        scene.draw()
+        encoder.put(surface)
+        count += 1
+
+    # The screens held after it, e.g. statistics
+    while holds and isinstance(manager.top, HoldScene) and \
+            (max_frames is None or count < max_frames):
+        hold = manager.top
+        hold.enter()
+        frames = int(hold.timer / speed / frame_time)
+        if max_frames is not None:
+            frames = min(frames, max_frames - count)
+        for _ in range(frames):
+            encoder.put(surface)
+            count += 1
+        hold.leave()
+
+    encoder.close()
+    pg.quit()
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export an Algrow "
+                                     "visualiser to a video, GIF or PNGs")
+    parser.add_argument("visualiser", help='e.g. "Bubble Sort", "A*"')
+    parser.add_argument("path", help="output .gif/.mp4/.webm/.mkv file "
+                                     "(needs ffmpeg) or PNG directory")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="how many times faster than in the app")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-holds", action="store_true",
+                        help="stop as soon as the visualiser finishes")
+    parser.add_argument("--max-frames", type=int)
+    parser.add_argument("--items", type=int, metavar="N",
+                        help="number of items to sort")
+    parser.add_argument("--workload", default="Shuffled",
+                        choices=load("Sorting.sort_visual", "WORKLOADS"),
+                        help="input to sort")
+    args = parser.parse_args()
+    frames = export(args.visualiser, args.path, args.fps, args.speed,
+                    args.seed, not args.no_holds, args.max_frames,
+                    args.items, args.workload)
+    print("Wrote %d frames" % frames)
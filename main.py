@@ -5,371 +5,283 @@
 
 The main file to run the program. Contains all the pygame selection
 windows. To run the program, just run this 
-file. 
+file. Run it with --startup to measure time to first frame, with
+--profile to see where frame time goes, or with --speed to play the
+algorithms faster or slower.
 
 - As of January 21, 2021
     - contains Bubble Sort, Insertion Sort, Selection Sort, 
     Sudoku Backtracking and A* Pathfinder visualisers.
 """
 
-import pygame
-import random
+import time
 
-from visual_helpers import *
+# Reference point for the time-to-first-frame report
+START = time.perf_counter()
 
-from Searching.sudoku_visual import *
-from Searching.astar_visual import *
+import argparse
+import pygame
 
-from Sorting.sort_functions import *
+from typing import Callable, Iterator, List, Optional, Tuple
 
+from visual_helpers import *
+from display import *
+from scene_manager import *
+from profiler import PROFILER
+from registry import SEARCHING, SORTING, Registry, load, load_catalogs
 
-def run_visualization() -> None:
-    """
-    Displays an interactive graphical display of sorting
-    algorithms
-    """
-    pygame.init()
-    pygame.display.set_caption('Algrow')
-    screen = pygame.display.set_mode((WIDTH, HEIGHT))
 
-    title_screen(screen)
+# How long the title screen stays up at most (milliseconds)
+TITLE_TIME = 3000
 
-    selection_screen(screen)
+# Time to first frame (milliseconds) --startup fails above
+STARTUP_BUDGET = 500
 
 
-def selection_screen(screen: pygame.Surface) -> None:
+def run_visualization(startup: Optional[float] = None,
+                      profile: Optional[str] = None, speed=1.0,
+                      items: Optional[int] = None) -> None:
     """
-    Selection screen between SEARCHING, SORTING, TITLE
+    Displays an interactive graphical display of sorting
+    algorithms. With <startup> (a budget in milliseconds), only show
+    the first frame, report how long it took and exit. With <profile>,
+    record frame timings (F3 toggles the HUD) and, unless it is empty,
+    write them to the CSV file <profile> on exit. Algorithms play
+    <speed> times faster than normal, and sort <items> items if given
     """
-    clear_screen(screen)
-    border(screen)
-
-    # Labels
-    draw_header(screen, "Table of Content")
-    b1 = PButton(screen, (180, 230, 300, 50))
-    b1.add_text("Sorting")
-    b2 = PButton(screen, (180, 300, 300, 50))
-    b2.add_text("Searching")
-    buttons = [b1 ,b2]
-    
-    # TODO: Recognize when clicked on "Searching" and go there
-    while True:
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                exit()
-
-            if event.type == pygame.MOUSEBUTTONUP:
-                x, y = event.pos
-                if b1.is_cursor_on((x, y), True):
-                    sort_selection(screen)
-                if b2.is_cursor_on((x, y), True):
-                    search_selection(screen)
-        
-        for b in buttons:
-            if b.is_cursor_on(pygame.mouse.get_pos()):
-                b.hover()
-            else:
-                b.draw()
-
-        pygame.display.flip()
+    if profile is not None:
+        PROFILER.enable(record=bool(profile))
 
+    pygame.init()
+    pygame.display.set_caption('Algrow')
+    display = Display((WIDTH, HEIGHT))
+    load_catalogs()
 
-def sort_selection(screen: pygame.Surface) -> None:
-    """ The screen that lets you pick what sorting method to
-    watch"""
-
-    # The list to sort    
-    item = [i for i in range(35, VISUALIZE_HEIGHT, 15)]
-    random.shuffle(item)
-
-    clear_screen(screen)
-    border(screen)
-    draw_header(screen, "Types of Sorting Algorithms")
-
-    # Labels
-    bubble = PButton(screen, (155, 230, 350, 50))
-    bubble.add_text("Bubble Sort")
-    insert = PButton(screen, (155, 330, 350, 50))
-    insert.add_text("Insertion Sort")
-    select = PButton(screen, (155, 430, 350, 50))
-    select.add_text("Selection Sort")
-    buttons = [bubble, insert, select]
-    
-    selected = ""
-    while selected == "":
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                exit()
-
-            if event.type == pygame.MOUSEBUTTONUP:
-                # Check which box was clicked
-                x, y = event.pos
-                if bubble.is_cursor_on((x, y), True):
-                    selected = "Bubble"
-                elif insert.is_cursor_on((x, y), True):
-                    selected = "Insertion"
-                elif select.is_cursor_on((x, y), True):
-                    selected = "Selection"
-        
-        for b in buttons:
-            if b.is_cursor_on(pygame.mouse.get_pos()):
-                b.hover()
-            else:
-                b.draw()
-            
-        pygame.display.flip()
-
-    if selected == "Bubble":
-        data = BubbleSteps(item)
-    elif selected == "Insertion":
-        data = InsertionSteps(item)
+    manager = SceneManager(display.surface, speed)
+    if startup is None:
+        manager.push(selection_screen(manager, items))
+        title = TitleScene(manager, TITLE_TIME)
     else:
-        data = SelectionSteps(item)
+        title = TitleScene(manager, 0)
+    manager.push(title)
+    manager.run()
 
-    render_sort(screen, data)
-    sort_event_loop(screen, data)
+    pygame.quit()
 
+    if profile:
+        PROFILER.export(profile)
 
-def search_selection(screen: pygame.Surface) -> None:
-    """ The screen that lets you pick what searching algorithm to
-    watch"""
+    if startup is not None:
+        first_frame = (first_frame_time() - START) * 1000
+        print("Time to first frame: %.1f ms (budget %.0f ms)"
+              % (first_frame, startup))
+        print("Warm up: %.1f ms" % title.warm_up_time)
+        if first_frame > startup:
+            exit(1)
 
-    clear_screen(screen)
-    border(screen)
-    draw_header(screen, "Types of Searching Algorithms")
 
-    # Labels
-    backtrack = PButton(screen, (155, 230, 350, 50))
-    backtrack.add_text("BackTracking")
-    astar = PButton(screen, (155, 330, 350, 50))
-    astar.add_text("A*")
-    buttons = [backtrack, astar]
-    
-    selected = ""
-    while selected == "":
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                exit()
-
-            if event.type == pygame.MOUSEBUTTONUP:
-                # Check which box was clicked
-                x, y = event.pos
-                if backtrack.is_cursor_on((x, y), True):
-                    selected = "Backtrack"
-                elif astar.is_cursor_on((x, y), True):
-                    selected = "A*"
-        
-        for b in buttons:
-            if b.is_cursor_on(pygame.mouse.get_pos()):
-                b.hover()
-            else:
-                b.draw()
-            
-        pygame.display.flip()
-
-    if selected == "Backtrack":
-        solve_sudoku_GUI(screen)
-    elif selected == "A*":
-        render_astar_vis(screen)
-    
-    
-# ============================= SORTING VISUALISATION METHODS ====================
-def render_sort(screen: pygame.Surface, data: SortSteps) -> None:
+class TitleScene(HoldScene):
     """
-    Renders the elements in a list and a text display to the
-    screen
-    """
-    clear_screen(screen)
-    border(screen)
-    
-    # Write the text
-    _render_text(screen, data)
-    
-    # Draw all the elements in list
-    _render_data(screen, data)  
-
-    pygame.display.flip()
+    The title screen. While it is up, fonts and static layers are
+    warmed up a piece every frame, on the main thread like all drawing
+    (fonts and the caches of visual_helpers aren't thread-safe). It is
+    left once <timer> is up (or on a click or key press) and the warm
+    up is done
 
+    ==== Public Attributes ====
+    warm_up_time: How long the warm up took (milliseconds)
 
-def _render_text(screen: pygame.Surface, data: SortSteps) -> None:
-    """
-    Renders the text at the top of the screen
-    """
-    small_font = get_font(20)
-    draw_header(screen, data.get_title() + " Sort")
-
-def _render_data(screen: pygame.Surface, data: SortSteps) -> None:
+    ==== Private Attributes ====
+    _warming: The warm up, None once done
     """
-    Draw all the elements in data
 
-    ==== Precondition ====
-    - len(data.items) = 32
-    """
-    x = 50
-    comp = (WIDTH - 96) // len(data.items)
-
-    for i, elem in enumerate(data.items):
-        rect = (x + (i * comp), HEIGHT - elem, 10, elem - 25)
-        highlight = _exist_color(i, data)
-        if highlight[0] and not data.complete():
-            pygame.draw.rect(screen, highlight[1], rect)
-        else:
-            pygame.draw.rect(screen, BARS, rect)
+    warm_up_time: float
+    _warming: Optional[Iterator[None]]
+
+    def __init__(self, manager: SceneManager, timer: int) -> None:
+        super().__init__(manager, timer, title_screen)
+        self.warm_up_time = 0.0
+        self._warming = warm_up(["Table of Content", SORTING.title,
+                                 SEARCHING.title])
+        # Frames keep coming until the warm up is done
+        self.blocking = False
+
+    def handle(self, event: pygame.event.Event) -> None:
+        if event.type in (pygame.MOUSEBUTTONUP, pygame.KEYUP):
+            self._end = pygame.time.get_ticks()
+
+    def update(self, steps: int) -> None:
+        if self._warming is not None:
+            # All that is left at once if the title screen is done
+            done = pygame.time.get_ticks() >= self._end
+            start = time.perf_counter()
+            for _ in self._warming:
+                if not done:
+                    break
+            else:
+                self._warming = None
+                self.blocking = True
+            self.warm_up_time += (time.perf_counter() - start) * 1000
+        super().update(steps)
 
 
-def _exist_color(n: int, data: SortSteps):
+class MenuScene(Scene):
     """
-    Return whether n is an index being compared in data
-    if yes, return it's color too. Otherwise, return False and an empty
-    Tuple
-    """
-    index = -1
-    for tup in data.indices:
-        if n in tup:
-            index = tup.index(n)
-
-    if index == -1:
-        return False, ()
-    if index == 0:
-        return True, tup[2]
-    return True, tup[-1]
+    A screen with a header and buttons that each lead somewhere.
+    Only redraws buttons the mouse enters or leaves
 
+    ==== Private Attributes ====
+    _title: The header of this menu
+    _options: The rect, label and action of every button
+    _buttons: The buttons, in the same order as _options
+    """
 
-def sort_event_loop(screen: pygame.Surface, data: SortSteps) -> None:
+    _title: str
+    _options: List[Tuple[Tuple[int], str, Callable[[], None]]]
+    _buttons: List[PButton]
+
+    def __init__(self, manager: SceneManager, title: str,
+                 options: List[Tuple[Tuple[int], str, Callable[[], None]]]) -> None:
+        super().__init__(manager)
+        self._title = title
+        self._options = options
+        self._buttons = []
+
+    def enter(self) -> None:
+        # Labels
+        draw_chrome(self.screen, self._title)
+        # Every label in one size, smaller if one is too wide for its
+        # button
+        size = FONT_HEIGHT
+        if any(get_font().size(label)[0] > coord[2] - 10
+               for coord, label, _ in self._options):
+            size = FONT_HEIGHT - 8
+        self._buttons = []
+        for coord, label, _ in self._options:
+            button = PButton(self.screen, coord)
+            button.add_text(label, size)
+            self._buttons.append(button)
+
+        for button in self._buttons:
+            button.update(mouse_pos())
+        present()
+
+    def handle(self, event: pygame.event.Event) -> None:
+        if event.type == pygame.MOUSEBUTTONUP:
+            # Check which box was clicked
+            for button, (_, _, action) in zip(self._buttons, self._options):
+                if button.is_cursor_on(event.pos):
+                    action()
+                    return
+
+        elif event.type == pygame.MOUSEMOTION:
+            # Only the buttons the cursor entered or left are redrawn
+            rects = []
+            for button in self._buttons:
+                rect = button.update(event.pos)
+                if rect is not None:
+                    rects.append(rect)
+            if rects:
+                present(rects)
+
+
+def menu_layout(n: int, top=230) -> List[Tuple[int]]:
+    """ Return the rects of <n> menu buttons, in columns when there
+    are too many to stack """
+    if n <= 3:
+        return [(155, top + i * 100, 350, 50) for i in range(n)]
+
+    cols = (n + 7) // 8
+    rows = (n + cols - 1) // cols
+    # Long columns start higher up, so their buttons stay tall enough
+    top = min(top, HEIGHT - 30 - rows * 56)
+    step = min(100, (HEIGHT - 30 - top) // rows)
+    width = (WIDTH - 100 - 20 * (cols - 1)) // cols
+    return [(50 + (i // rows) * (width + 20), top + (i % rows) * step,
+             width, min(50, step - 15)) for i in range(n)]
+
+
+def selection_screen(manager: SceneManager,
+                     items: Optional[int] = None) -> MenuScene:
     """
-    Update display or respond to events (mouse clicks, key presses)
+    Selection screen between SEARCHING, SORTING. Sorting algorithms
+    sort <items> items if given
     """
-    time_elapsed = 0
-    clock = pygame.time.Clock()
+    return MenuScene(manager, "Table of Content", [
+        ((180, 230, 300, 50), "Sorting",
+         lambda: manager.push(sort_selection(manager, items))),
+        ((180, 300, 300, 50), "Searching",
+         lambda: manager.push(search_selection(manager)))])
 
-    timer = 25
-    paused = False
-    while True:
-        dt = clock.tick()
 
-        time_elapsed += dt
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                exit()
+def registry_menu(manager: SceneManager, registry: Registry,
+                  start: Callable[[object], None]) -> MenuScene:
+    """ A menu with a button for every visualiser in <registry>. 
+    Picking one loads it and passes it to <start> """
+    
+    def pick(entry) -> Callable[[], None]:
+        return lambda: start(entry.load())
 
-            if event.type == pygame.MOUSEBUTTONUP:
-                paused = not paused
+    rects = menu_layout(len(registry))
+    return MenuScene(manager, registry.title, 
+                     [(rect, entry.label, pick(entry)) 
+                      for rect, entry in zip(rects, registry)])
 
-        if data.complete() and not paused:
-            sort_end(screen, data)
 
-        if time_elapsed > timer and not paused:
-            data.iterate()
-            time_elapsed = 0
+def sort_selection(manager: SceneManager,
+                   items: Optional[int] = None) -> MenuScene:
+    """ The screen that lets you pick what sorting method to
+    watch, sorting <items> items if given"""
 
-        render_sort(screen, data)
+    def start(steps: type) -> None:
+        manager.replace(workload_selection(manager, steps, items))
 
-def sort_end(screen: pygame.Surface, data: SortSteps) -> None:
-    """
-    Once it's finished sorting
-    """
-    pygame.time.wait(2000)
+    return registry_menu(manager, SORTING, start)
 
-    clear_screen(screen)
-    border(screen)
 
-    # Labels
-    draw_header(screen, data.get_title() + " Sort" + " Statistics")
-    write_text(screen, "Step(s): " + str(data.step), get_font(50), TEXT, (50, 235))
-    write_text(screen, "Cycle: " + str(data.cycle), get_font(50), TEXT, (50, 435))
+def workload_selection(manager: SceneManager, steps: type,
+                       items: Optional[int] = None) -> MenuScene:
+    """ The screen that lets you pick what input the sorting method
+    <steps> sorts, of <items> items if given"""
 
-    time_loop(screen, 6000)
-    selection_screen(screen)
-    
+    def pick(workload: str) -> Callable[[], None]:
+        def start() -> None:
+            # The list to sort
+            item = load("Sorting.sort_visual", "sort_items")(
+                items, workload=workload)
+            scene = load("Sorting.sort_visual", "SortScene")
+            manager.replace(scene(manager, steps(item)))
+        return start
 
-# ========================== BACKTRACKING AND ASTAR ================================
-def solve_sudoku_GUI(screen: pg.Surface) -> None:
-    """ Solve sudoku using backtracking algorithm and display
-    it on GUI """
-    
-    clear_screen(screen)
-    board = SudokuBoard()
-    board.draw(screen)
-    done = False
-    while not done:
-        
-        for e in pg.event.get():
-            if e.type == pg.QUIT:
-                selection_screen(screen)
-            
-        done = board.solve(screen)
-
-        board.draw(screen)
-        pg.display.flip()
-    
-    board.finished(screen)
-    time_loop(screen, 8000)
-    selection_screen(screen)
+    workloads = load("Sorting.sort_visual", "WORKLOADS")
+    rects = menu_layout(len(workloads))
+    return MenuScene(manager, "Input to Sort",
+                     [(rect, workload, pick(workload))
+                      for rect, workload in zip(rects, workloads)])
 
 
-def render_astar_vis(screen: pygame.Surface) -> None:
-    """ Render the astar simulation program """
- 
-    board = Maze()
-    board.draw(screen)
-    
-    # Mode 0 is for selecting start, end pts
-    # Mode 1 is for creating obstacles
-    # Mode 2 is for clearing obstacles
-    mode, ans = 0, []
-    while ans == []:
-        
-        for e in pg.event.get():
-            if e.type == pg.QUIT:
-                pg.quit()
-                exit()
-            
-            # If a key is pressed
-            if e.type == pg.KEYUP:
-                
-                # Left Shift for adding obstacles
-                if e.key == pg.K_LSHIFT:
-                    if mode != 1:
-                        mode = 1
-                    else:
-                        mode = 0
-                
-                # Capslock for clearing obstacles
-                if e.key == pg.K_CAPSLOCK:
-                    if mode != 2:
-                        mode = 2
-                    else:
-                        mode = 0
-                
-                # Space to start simulation
-                if e.key == pg.K_SPACE:
-                    ans = board.solve_astar(screen)
-            
-            # If clicked with mouse
-            if e.type == pg.MOUSEBUTTONDOWN and mode == 0:
-                x, y = pg.mouse.get_pos()
-                if e.button == 1:
-                    board.start_end(x, y, mode)
-                
-                elif e.button == 3:
-                    board.start_end(x, y, mode, True)
-                    
-                    
-        x, y = pg.mouse.get_pos()
-        board.set_tile_state(x, y, mode)
-        
-        if not ans:
-            board.draw(screen)
-            pg.display.flip()
-    
-    selection_screen(screen)
+def search_selection(manager: SceneManager) -> MenuScene:
+    """ The screen that lets you pick what searching algorithm to
+    watch"""
+    return registry_menu(manager, SEARCHING,
+                         lambda scene: manager.replace(scene(manager)))
     
     
 if __name__ == '__main__':
-    run_visualization()
+    parser = argparse.ArgumentParser(description="Algrow")
+    parser.add_argument("--startup", type=float, nargs="?", 
+                        const=STARTUP_BUDGET, metavar="BUDGET_MS",
+                        help="show the first frame, report how long it "
+                             "took and exit (1 if over the budget)")
+    parser.add_argument("--profile", nargs="?", const="", metavar="CSV",
+                        help="show frame timings (F3 toggles the HUD) and "
+                             "write them to CSV on exit")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="how many times faster than normal the "
+                             "algorithms play, from 1/16 to 4096 (+/- and "
+                             "up/down change it, 0 resets it)")
+    parser.add_argument("--items", type=int, metavar="N",
+                        help="number of items to sort; thousands and more "
+                             "are drawn into a pixel buffer")
+    args = parser.parse_args()
+    run_visualization(args.startup, args.profile, args.speed, args.items)
@@ -0,0 +1,244 @@
+"""
+Opt-in per-frame profiling of Algrow's main loop.
+
+The main loop wraps each phase of a frame (handling events, running
+algorithm steps, rendering, presenting, sleeping) in PROFILER.phase().
+When profiling is on, the time spent in each phase is recorded per
+frame and shown on a toggleable HUD; every frame is only kept, to be
+exported to CSV, when asked for.
+"""
+
+import csv
+import time
+import pygame as pg
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+# Phases of a frame, in the order they happen
+PHASES = ["events", "step", "render", "present", "idle"]
+
+# Number of recent frames the HUD statistics are taken over
+HUD_WINDOW = 240
+
+# How often the HUD text is refreshed (milliseconds)
+HUD_REFRESH = 250
+
+HUD_COLOR = (125, 255, 186)
+HUD_BACKGROUND = (0, 0, 0, 180)
+
+
+class _Phase:
+    """
+    Context manager timing one phase of the frame. Does nothing while
+    the profiler is off
+
+    ==== Private Attributes ====
+    _profiler: The profiler the time goes to
+    _name: The name of this phase
+    """
+
+    _profiler: 'Profiler'
+    _name: str
+
+    def __init__(self, profiler: 'Profiler', name: str) -> None:
+        self._profiler = profiler
+        self._name = name
+
+    def __enter__(self) -> None:
+        if self._profiler.enabled:
+            self._profiler._start(self._name)
+
+    def __exit__(self, *args) -> None:
+        if self._profiler.enabled:
+            self._profiler._stop()
+
+
+class Profiler:
+    """
+    Records how long each phase of every frame takes. Time spent in a
+    phase nested in another (presenting while rendering) only counts
+    towards the inner one
+
+    ==== Public Attributes ====
+    enabled: Whether timings are being recorded
+    hud: Whether the HUD is shown
+    record: Whether every frame is kept in <frames>, for export()
+    frames: One row per frame if <record>: frame number, start (ms
+            since profiling started), total and busy (total minus idle)
+            time, then the time of every phase in PHASES and the number
+            of algorithm steps run
+
+    ==== Private Attributes ====
+    _phases: The context managers handed out by phase()
+    _times: Time spent in each phase this frame (seconds)
+    _stack: The phases currently running and when they started
+    _frame_start: When this frame started
+    _origin: When profiling started
+    _count: The number of frames closed
+    _last: The row of the last frame closed, as in <frames>
+    _busy: Busy times of the last HUD_WINDOW frames (milliseconds)
+    _totals: Total times of the last HUD_WINDOW frames (milliseconds)
+    _steps: Algorithm steps of the last HUD_WINDOW frames
+    _hud_surface: The rendered HUD
+    _hud_time: When the HUD text was last refreshed
+    _font: The font of the HUD
+    """
+
+    enabled: bool
+    hud: bool
+    record: bool
+    frames: List[tuple]
+    _phases: Dict[str, _Phase]
+    _times: Dict[str, float]
+    _stack: List[list]
+    _frame_start: float
+    _origin: float
+    _count: int
+    _last: Optional[tuple]
+    _busy: Deque[float]
+    _totals: Deque[float]
+    _steps: Deque[int]
+    _hud_surface: Optional[pg.Surface]
+    _hud_time: float
+    _font: Optional[pg.font.Font]
+
+    def __init__(self) -> None:
+        """ Initializes a Profiler that is off """
+        self.enabled = False
+        self.hud = False
+        self.record = False
+        self.frames = []
+        self._phases = {}
+        self._times = dict.fromkeys(PHASES, 0.0)
+        self._stack = []
+        self._frame_start = 0.0
+        self._origin = 0.0
+        self._count = 0
+        self._last = None
+        self._busy = deque(maxlen=HUD_WINDOW)
+        self._totals = deque(maxlen=HUD_WINDOW)
+        self._steps = deque(maxlen=HUD_WINDOW)
+        self._hud_surface = None
+        self._hud_time = 0.0
+        self._font = None
+
+    def enable(self, hud=True, record=False) -> None:
+        """ Start recording, showing the HUD if <hud> and keeping every
+        frame if <record> """
+        self.enabled = True
+        self.hud = hud
+        self.record = record
+        self._origin = self._frame_start = time.perf_counter()
+
+    def toggle_hud(self) -> None:
+        """ Show or hide the HUD """
+        self.hud = not self.hud
+        self._hud_surface = None
+
+    def phase(self, name: str) -> _Phase:
+        """ Return a context manager timing the phase <name> """
+        if name not in self._phases:
+            self._phases[name] = _Phase(self, name)
+        return self._phases[name]
+
+    def _start(self, name: str) -> None:
+        self._stack.append([name, time.perf_counter()])
+
+    def _stop(self) -> None:
+        name, start = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        self._times[name] = self._times.get(name, 0.0) + elapsed
+        if self._stack:
+            parent = self._stack[-1][0]
+            self._times[parent] = self._times.get(parent, 0.0) - elapsed
+
+    def end_frame(self, steps: int) -> None:
+        """ Close the current frame, in which <steps> algorithm steps
+        ran, and start the next one """
+        if not self.enabled:
+            return
+
+        now = time.perf_counter()
+        total = (now - self._frame_start) * 1000
+        phases = [self._times.get(name, 0.0) * 1000 for name in PHASES]
+        busy = total - phases[PHASES.index("idle")]
+        self._last = (self._count,
+                      (self._frame_start - self._origin) * 1000,
+                      total, busy, *phases, steps)
+        self._count += 1
+        # Only the HUD_WINDOW frames of the HUD are kept otherwise
+        if self.record:
+            self.frames.append(self._last)
+
+        self._busy.append(busy)
+        self._totals.append(total)
+        self._steps.append(steps)
+        self._times = dict.fromkeys(PHASES, 0.0)
+        self._frame_start = now
+
+    def stats(self) -> Dict[str, float]:
+        """ Return the FPS, steps per second and p50/p99 busy frame
+        times (milliseconds) over the last HUD_WINDOW frames """
+        if not self._totals:
+            return {"fps": 0.0, "steps": 0.0, "p50": 0.0, "p99": 0.0}
+
+        elapsed = sum(self._totals) / 1000
+        busy = sorted(self._busy)
+        return {"fps": len(self._totals) / elapsed if elapsed else 0.0,
+                "steps": sum(self._steps) / elapsed if elapsed else 0.0,
+                "p50": busy[len(busy) // 2],
+                "p99": busy[min(len(busy) - 1, int(len(busy) * 0.99))]}
+
+    def hud_surface(self) -> Optional[pg.Surface]:
+        """ Return the HUD, refreshed at most every HUD_REFRESH
+        milliseconds, or None if it is hidden """
+        if not (self.enabled and self.hud):
+            return None
+
+        now = time.perf_counter()
+        if self._hud_surface is None or \
+                (now - self._hud_time) * 1000 >= HUD_REFRESH:
+            self._hud_surface = self._render_hud()
+            self._hud_time = now
+        return self._hud_surface
+
+    def _render_hud(self) -> pg.Surface:
+        """ Render the HUD text """
+        # Not through write_text: this text changes all the time and
+        # would only churn the text cache
+        if self._font is None:
+            self._font = pg.font.Font(None, 20)
+        font = self._font
+        stats = self.stats()
+        lines = ["FPS %.1f   steps/s %.0f" % (stats["fps"], stats["steps"]),
+                 "frame p50 %.2f ms   p99 %.2f ms" % (stats["p50"],
+                                                      stats["p99"])]
+        if self._last is not None:
+            last = self._last
+            lines.append("  ".join("%s %.2f" % (name, last[4 + i])
+                                   for i, name in enumerate(PHASES[:-1])))
+
+        texts = [font.render(line, True, HUD_COLOR) for line in lines]
+        width = max(text.get_width() for text in texts) + 10
+        height = sum(text.get_height() for text in texts) + 10
+        surface = pg.Surface((width, height), pg.SRCALPHA)
+        surface.fill(HUD_BACKGROUND)
+        y = 5
+        for text in texts:
+            surface.blit(text, (5, y))
+            y += text.get_height()
+        return surface
+
+    def export(self, path: str) -> None:
+        """ Write every recorded frame to the CSV file at <path> """
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "start_ms", "total_ms", "busy_ms"] +
+                            [name + "_ms" for name in PHASES] + ["steps"])
+            for row in self.frames:
+                writer.writerow([row[0]] + ["%.3f" % v for v in row[1:-1]] +
+                                [row[-1]])
+
+
+# The profiler of the main loop, off unless enabled
+PROFILER = Profiler()
@@ -0,0 +1,84 @@
+"""
+The visualisers Algrow can show.
+
+Visualisers are declared by module path and attribute name in small
+catalog modules, and are only imported once picked from a menu, so
+adding algorithms doesn't slow down startup.
+"""
+
+import importlib
+from typing import Any, Iterator, List
+
+# Modules declaring visualisers, imported at startup (keep them cheap)
+CATALOGS = ["Sorting.catalog", "Searching.catalog"]
+
+
+def load(module: str, attr: str) -> Any:
+    """ Import <module> and return its <attr> """
+    return getattr(importlib.import_module(module), attr)
+
+
+class Entry:
+    """
+    A declared visualiser
+
+    ==== Public Attributes ====
+    label: The name shown on its menu button
+    module: The module it lives in
+    attr: Its name in <module>
+    """
+
+    label: str
+    module: str
+    attr: str
+
+    def __init__(self, label: str, module: str, attr: str) -> None:
+        """ Initializes an Entry """
+        self.label = label
+        self.module = module
+        self.attr = attr
+
+    def load(self) -> Any:
+        """ Import the visualiser and return it """
+        return load(self.module, self.attr)
+
+
+class Registry:
+    """
+    The visualisers of one kind, in the order they were declared
+
+    ==== Public Attributes ====
+    title: The header of this kind's menu
+    entries: The declared visualisers
+    """
+
+    title: str
+    entries: List[Entry]
+
+    def __init__(self, title: str) -> None:
+        """ Initializes an empty Registry """
+        self.title = title
+        self.entries = []
+
+    def declare(self, label: str, module: str, attr: str) -> None:
+        """ Declare the visualiser <attr> of <module>, shown as <label> """
+        self.entries.append(Entry(label, module, attr))
+
+    def __iter__(self) -> Iterator[Entry]:
+        return iter(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+# Sorting visualisers are SortSteps subclasses
+SORTING = Registry("Types of Sorting Algorithms")
+
+# Searching visualisers are Scene subclasses taking the SceneManager
+SEARCHING = Registry("Types of Searching Algorithms")
+
+
+def load_catalogs() -> None:
+    """ Import every catalog so their visualisers are declared """
+    for catalog in CATALOGS:
+        importlib.import_module(catalog)
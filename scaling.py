@@ -0,0 +1,293 @@
+"""
+Empirical scaling of Algrow's sorting algorithms.
+
+Every sorting stepper in the menu is run headlessly to the end of its
+algorithm on seeded inputs of growing size, in four shapes (random,
+sorted, reversed and few unique values), counting the comparisons,
+swaps (or moves) and writes it makes. How its comparisons and writes
+together grow with the size is fitted two ways: the exponent of the
+power law through them, and which of the usual growth curves (n,
+n log n, n log^2 n, n^2) follows them most closely. The counts of the
+largest size and the fits go to a Markdown table, and a PNG chart plots
+the operations against the size of every algorithm on log-log axes, one
+panel per input shape.
+
+    $ python scaling.py --output scaling.md --chart scaling.png
+    $ python scaling.py --sizes 256 1024 4096 16384 --only Radix
+"""
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import math
+import random
+import sys
+import pygame as pg
+from typing import Callable, Dict, List, Optional, Tuple
+
+from registry import SORTING, load_catalogs
+from visual_helpers import BACKGROUND, LIGHT_BG, TEXT, FONT_PATH
+
+# Input sizes every algorithm is run on
+SIZES = [64, 128, 256, 512, 1024, 2048]
+
+# Values there are in few unique inputs
+FEW_UNIQUE = 4
+
+# The operations counted, as the attributes of a SortSteps
+COUNTERS = ["comparisons", "swaps", "writes"]
+
+# The counters whose total is fitted: swaps and moves are in the writes
+TOTAL = ["comparisons", "writes"]
+
+# Size of the chart, and of the column of its legend
+CHART_SIZE = (1400, 1000)
+LEGEND_WIDTH = 260
+
+# Font size of the chart's labels
+CHART_FONT = 18
+
+
+def _random(size: int, rng: random.Random) -> List[int]:
+    """ Every item from 1 to <size> once, shuffled """
+    items = list(range(1, size + 1))
+    rng.shuffle(items)
+    return items
+
+
+def _sorted(size: int, rng: random.Random) -> List[int]:
+    """ Every item from 1 to <size> once, in order """
+    return list(range(1, size + 1))
+
+
+def _reversed(size: int, rng: random.Random) -> List[int]:
+    """ Every item from 1 to <size> once, from the largest down """
+    return list(range(size, 0, -1))
+
+
+def _few_unique(size: int, rng: random.Random) -> List[int]:
+    """ <size> items of FEW_UNIQUE values, in random order """
+    return [rng.randint(1, FEW_UNIQUE) for _ in range(size)]
+
+
+# The shapes of input, by name: each makes the items of a size
+DISTRIBUTIONS: Dict[str, Callable[[int, random.Random], List[int]]] = {
+    "random": _random,
+    "sorted": _sorted,
+    "reversed": _reversed,
+    "few-unique": _few_unique,
+}
+
+# The growth curves fitted, by name
+MODELS: Dict[str, Callable[[int], float]] = {
+    "n": lambda n: n,
+    "n log n": lambda n: n * math.log2(n),
+    "n log^2 n": lambda n: n * math.log2(n) ** 2,
+    "n^2": lambda n: n * n,
+}
+
+
+def count(stepper: type, items: List[int]) -> Dict[str, int]:
+    """ Sort <items> with <stepper> to the end of its algorithm and
+    return the operations it counted, and its steps """
+    data = stepper(items)
+    data.advance(sys.maxsize, whole=True)
+    counts = {counter: getattr(data, counter) for counter in COUNTERS}
+    counts["steps"] = data.step
+    return counts
+
+
+def fit(sizes: List[int], totals: List[int]) \
+        -> Tuple[Optional[float], Optional[str], float]:
+    """ Return the exponent of the power law through <totals> against
+    <sizes>, the growth curve of MODELS closest to them and its
+    constant, on a log scale. Sizes with no operations are left out;
+    None for what can't be fitted """
+    points = [(n, math.log(n), math.log(total))
+              for n, total in zip(sizes, totals) if total > 0 and n > 1]
+    if len(points) < 2:
+        return None, None, 0.0
+    mean_x = sum(x for _, x, _ in points) / len(points)
+    mean_y = sum(y for _, _, y in points) / len(points)
+    spread = sum((x - mean_x) ** 2 for _, x, _ in points)
+    exponent = sum((x - mean_x) * (y - mean_y) for _, x, y in points) / \
+        spread if spread else None
+
+    best, best_error, constant = None, math.inf, 0.0
+    for name, model in MODELS.items():
+        # Off by a constant factor, the residuals all shift the same
+        residuals = [y - math.log(model(n)) for n, _, y in points]
+        mean = sum(residuals) / len(residuals)
+        error = sum((r - mean) ** 2 for r in residuals)
+        if error < best_error:
+            best, best_error, constant = name, error, math.exp(mean)
+    return exponent, best, constant
+
+
+def run_report(sizes=SIZES, pattern="", seed=0) -> List[dict]:
+    """ Run every sorting algorithm whose menu label contains <pattern>
+    over every shape of input at every size in <sizes>, and return a
+    row for each algorithm and shape: its counts at every size and the
+    fit of their total """
+    load_catalogs()
+    rows = []
+    for entry in SORTING:
+        if pattern.lower() not in entry.label.lower():
+            continue
+        stepper = entry.load()
+        for shape, make in DISTRIBUTIONS.items():
+            counts = [count(stepper, make(size, random.Random(
+                "%d-%s-%d" % (seed, shape, size)))) for size in sizes]
+            totals = [sum(c[counter] for counter in TOTAL)
+                      for c in counts]
+            exponent, model, constant = fit(sizes, totals)
+            rows.append({"algorithm": entry.label, "input": shape,
+                         "sizes": list(sizes), "counts": counts,
+                         "totals": totals, "exponent": exponent,
+                         "model": model, "constant": constant})
+            print("%-18s %-10s %12d ops at n=%-6d %s" %
+                  (entry.label, shape, totals[-1], sizes[-1],
+                   _growth(exponent, model, constant)))
+    return rows
+
+
+def _growth(exponent: Optional[float], model: Optional[str],
+            constant: float) -> str:
+    """ Return the fit of a row as text """
+    if model is None:
+        return "-"
+    text = "%.2f %s" % (constant, model)
+    if exponent is not None:
+        text += " (n^%.2f)" % exponent
+    return text
+
+
+def write_table(rows: List[dict], path: str) -> None:
+    """ Write <rows> as a Markdown table to the file at <path> """
+    n = rows[0]["sizes"][-1] if rows else 0
+    lines = ["| Algorithm | Input | Comparisons | Swaps/Moves | Writes "
+             "| Steps | Exponent | Best fit |",
+             "|---|---|---:|---:|---:|---:|---:|---|"]
+    for row in rows:
+        last = row["counts"][-1]
+        exponent = "-" if row["exponent"] is None \
+            else "%.2f" % row["exponent"]
+        best = "-" if row["model"] is None \
+            else "%.2f %s" % (row["constant"], row["model"])
+        lines.append("| %s | %s | %d | %d | %d | %d | %s | %s |" %
+                     (row["algorithm"], row["input"], last["comparisons"],
+                      last["swaps"], last["writes"], last["steps"],
+                      exponent, best))
+    with open(path, "w") as f:
+        f.write("Operations sorting %d items, and how they grow with the "
+                "number of items n\n\n" % n)
+        f.write("\n".join(lines) + "\n")
+
+
+def draw_chart(rows: List[dict], path: str) -> None:
+    """ Plot the total operations of <rows> against their size, one
+    panel per shape of input on log-log axes, and save it as a PNG at
+    <path> """
+    pg.init()
+    font = pg.font.Font(FONT_PATH, CHART_FONT)
+    chart = pg.Surface(CHART_SIZE)
+    chart.fill(BACKGROUND)
+
+    algorithms = list(dict.fromkeys(row["algorithm"] for row in rows))
+    colours = {}
+    for k, algorithm in enumerate(algorithms):
+        colour = pg.Color(0)
+        # Turning by the golden angle keeps neighbours far apart
+        colour.hsva = (k * 137.5 % 360, 60 + 40 * (k % 2), 100, 100)
+        colours[algorithm] = colour
+
+    # Every panel shares the same axes, so they can be compared
+    sizes = [n for row in rows for n in row["sizes"] if n > 1]
+    totals = [t for row in rows for t in row["totals"] if t > 0]
+    if not sizes or not totals:
+        pg.image.save(chart, path)
+        return
+    x_range = (math.log10(min(sizes)), math.log10(max(sizes)))
+    y_range = (math.floor(math.log10(min(totals))),
+               math.ceil(math.log10(max(totals))))
+
+    width = (CHART_SIZE[0] - LEGEND_WIDTH) // 2
+    height = CHART_SIZE[1] // 2
+    for k, shape in enumerate(DISTRIBUTIONS):
+        area = pg.Rect((k % 2) * width, (k // 2) * height, width, height)
+        _draw_panel(chart, area.inflate(-30, -30), font, shape,
+                    [row for row in rows if row["input"] == shape],
+                    colours, x_range, y_range)
+
+    # The legend
+    x = CHART_SIZE[0] - LEGEND_WIDTH + 10
+    for k, algorithm in enumerate(algorithms):
+        y = 30 + k * (CHART_FONT + 10)
+        pg.draw.line(chart, colours[algorithm], (x, y + CHART_FONT // 2),
+                     (x + 30, y + CHART_FONT // 2), 3)
+        chart.blit(font.render(algorithm, True, TEXT), (x + 40, y))
+    pg.image.save(chart, path)
+
+
+def _draw_panel(chart: pg.Surface, area: pg.Rect, font: pg.font.Font,
+                title: str, rows: List[dict],
+                colours: Dict[str, pg.Color],
+                x_range: Tuple[float, float],
+                y_range: Tuple[float, float]) -> None:
+    """ Draw the panel of <rows> in <area> of <chart>, with log10 of
+    the sizes spanning <x_range> and of the operations <y_range> """
+    plot = pg.Rect(area.x + 60, area.y + 30, area.w - 70, area.h - 60)
+
+    def point(n: int, total: int) -> Tuple[int, int]:
+        x = (math.log10(n) - x_range[0]) / max(1e-9, x_range[1] - x_range[0])
+        y = (math.log10(total) - y_range[0]) / \
+            max(1e-9, y_range[1] - y_range[0])
+        return plot.x + round(x * plot.w), plot.bottom - round(y * plot.h)
+
+    chart.blit(font.render(title, True, TEXT), (plot.x, area.y))
+    # Grid lines at every size, and every power of ten of operations
+    for n in sorted({n for row in rows for n in row["sizes"] if n > 1}):
+        x = point(n, 1)[0]
+        pg.draw.line(chart, LIGHT_BG, (x, plot.y), (x, plot.bottom))
+        label = font.render(str(n), True, TEXT)
+        chart.blit(label, (x - label.get_width() // 2, plot.bottom + 4))
+    for power in range(int(y_range[0]), int(y_range[1]) + 1):
+        y = plot.bottom - round((power - y_range[0]) * plot.h /
+                                max(1, y_range[1] - y_range[0]))
+        pg.draw.line(chart, LIGHT_BG, (plot.x, y), (plot.right, y))
+        label = font.render("1e%d" % power, True, TEXT)
+        chart.blit(label, (plot.x - label.get_width() - 6,
+                           y - label.get_height() // 2))
+    pg.draw.rect(chart, TEXT, plot, 1)
+
+    for row in rows:
+        points = [point(n, total) for n, total in
+                  zip(row["sizes"], row["totals"]) if n > 1 and total > 0]
+        if len(points) > 1:
+            pg.draw.lines(chart, colours[row["algorithm"]], False, points, 2)
+        for x, y in points:
+            pg.draw.circle(chart, colours[row["algorithm"]], (x, y), 3)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Count the operations of "
+                                     "Algrow's sorting algorithms as inputs "
+                                     "grow and fit their growth")
+    parser.add_argument("--output", default="scaling.md",
+                        help="Markdown file the table is written to")
+    parser.add_argument("--chart", default="scaling.png",
+                        help="PNG file the chart is written to")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--only", default="",
+                        help="only run algorithms whose name contains this")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    report = run_report(sorted(args.sizes), args.only, args.seed)
+    write_table(report, args.output)
+    draw_chart(report, args.chart)
+    pg.quit()
+    print("Wrote %s and %s" % (args.output, args.chart))
@@ -0,0 +1,321 @@
+"""
+A stack of scenes (screens) for Algrow, all run by one main loop.
+
+Screens push, pop or replace each other on the stack instead of
+calling one another, so moving between screens never grows the call
+stack and a finished screen is dropped as soon as it is left.
+"""
+
+import pygame as pg
+from typing import Callable, List, Optional
+
+from display import present, resize, set_overlay, to_logical
+from profiler import PROFILER
+from scheduler import Scheduler, clamp_speed
+from visual_helpers import BACKGROUND, TEXT, get_font, get_text
+
+# Keys changing the speed of every animation: doubling it, halving it
+# and back to normal
+FASTER_KEYS = [pg.K_UP, pg.K_EQUALS, pg.K_PLUS, pg.K_KP_PLUS]
+SLOWER_KEYS = [pg.K_DOWN, pg.K_MINUS, pg.K_KP_MINUS]
+NORMAL_KEYS = [pg.K_0, pg.K_KP0]
+
+# How long (milliseconds) the speed stays on screen after a change
+SPEED_BADGE_TIME = 1500
+
+
+class Scene:
+    """
+    One screen of Algrow
+
+    ==== Public Attributes ====
+    manager: The SceneManager running this scene
+    screen: The surface this scene draws on
+    scheduler: Paces this scene's frames and algorithm steps
+    blocking: Whether the scene only changes in response to events,
+              in which case the main loop sleeps until one arrives
+    """
+
+    manager: 'SceneManager'
+    screen: pg.Surface
+    scheduler: Scheduler
+    blocking: bool
+
+    # Algorithm steps per second, for scenes that animate something
+    rate = 0
+
+    def __init__(self, manager: 'SceneManager') -> None:
+        """ Initializes a Scene run by <manager> """
+        self.manager = manager
+        self.screen = manager.screen
+        self.scheduler = Scheduler(self.rate)
+        self.blocking = True
+
+    def enter(self) -> None:
+        """ Draw the whole scene, called whenever it becomes the top
+        of the stack """
+        pass
+
+    def handle(self, event: pg.event.Event) -> None:
+        """ Respond to <event> """
+        pass
+
+    def update(self, steps: int) -> None:
+        """ Advance the scene by <steps> algorithm steps """
+        pass
+
+    def draw(self) -> None:
+        """ Draw and present what changed since the last frame """
+        pass
+
+    def timeout(self) -> Optional[int]:
+        """ Return how long (milliseconds) a blocking scene may sleep
+        waiting for an event, or None to sleep until one arrives """
+        return None
+
+    def close(self) -> None:
+        """ Let go of anything running in the background, called when
+        the scene leaves the stack """
+        pass
+
+    def autoplay(self, seed: int) -> None:
+        """ Set the scene up to play without any input (for exports
+        and benchmarks), using <seed> for anything random """
+        pass
+
+
+class HoldScene(Scene):
+    """
+    Keeps a screen up for a while, then pops itself or is replaced
+    by <then>
+
+    ==== Public Attributes ====
+    timer: How long to hold the screen (milliseconds)
+    then: The scene that replaces this one when time is up
+
+    ==== Private Attributes ====
+    _draw: Draws the screen, or None to keep what is already there
+    _end: The tick at which time is up
+    """
+
+    timer: int
+    then: Optional[Scene]
+    _draw: Optional[Callable[[pg.Surface], None]]
+    _end: int
+
+    def __init__(self, manager: 'SceneManager', timer: int,
+                 draw: Optional[Callable[[pg.Surface], None]] = None,
+                 then: Optional[Scene] = None) -> None:
+        """ Initializes a HoldScene """
+        super().__init__(manager)
+        self._draw = draw
+        self.timer = timer
+        self.then = then
+        self._end = 0
+
+    def enter(self) -> None:
+        if self._draw is not None:
+            self._draw(self.screen)
+        present()
+        self._end = pg.time.get_ticks() + self.timer
+
+    def update(self, steps: int) -> None:
+        if pg.time.get_ticks() >= self._end:
+            self.leave()
+
+    def leave(self) -> None:
+        """ Give way to <then>, or to the scene underneath """
+        if self.then is not None:
+            self.manager.replace(self.then)
+        else:
+            self.manager.pop()
+
+    def timeout(self) -> Optional[int]:
+        return max(1, self._end - pg.time.get_ticks())
+
+
+class SceneManager:
+    """
+    Runs the scene on top of a stack of scenes
+
+    ==== Public Attributes ====
+    screen: The surface every scene draws on
+    speed: The speed multiplier every scene's scheduler runs at
+
+    ==== Private Attributes ====
+    _stack: The scenes, the running one last
+    _entered: The scene that was last entered
+    _overlay: The surfaces (profiler HUD, speed badge) shown over the
+              picture, and the overlay made of them
+    _badge: The last speed badge rendered, and its text
+    _badge_end: The tick at which the speed badge is taken off
+    """
+
+    screen: pg.Surface
+    speed: float
+    _stack: List[Scene]
+    _entered: Optional[Scene]
+    _overlay: tuple
+    _badge: tuple
+    _badge_end: int
+
+    def __init__(self, screen: pg.Surface, speed=1.0) -> None:
+        """ Initializes an empty SceneManager """
+        self.screen = screen
+        self.speed = clamp_speed(speed)
+        self._stack = []
+        self._entered = None
+        self._overlay = ((), None)
+        self._badge = ("", None)
+        self._badge_end = 0
+
+    @property
+    def top(self) -> Optional[Scene]:
+        """ The running scene """
+        return self._stack[-1] if self._stack else None
+
+    def push(self, scene: Scene) -> None:
+        """ Run <scene> on top of the current one """
+        self._stack.append(scene)
+
+    def pop(self) -> None:
+        """ Leave the current scene and go back to the one under it """
+        if self._stack:
+            self._stack.pop().close()
+
+    def replace(self, scene: Scene) -> None:
+        """ Leave the current scene for <scene> """
+        self.pop()
+        self.push(scene)
+
+    def quit(self) -> None:
+        """ Leave every scene, ending run() """
+        while self._stack:
+            self.pop()
+
+    def run(self) -> None:
+        """ The main loop: run the top scene until the stack is empty """
+        while self._stack:
+            scene = self.top
+            if scene is not self._entered:
+                self._entered = scene
+                with PROFILER.phase("render"):
+                    scene.enter()
+                scene.scheduler.speed = self.speed
+                scene.scheduler.reset()
+
+            events = []
+            if scene.blocking:
+                timeout = scene.timeout()
+                # Wake up in time to take the speed badge off
+                badge = self._badge_end - pg.time.get_ticks()
+                if badge > 0:
+                    timeout = badge if timeout is None else min(timeout, badge)
+                with PROFILER.phase("idle"):
+                    first = pg.event.wait() if timeout is None \
+                        else pg.event.wait(timeout)
+                events.append(first)
+
+            with PROFILER.phase("events"):
+                events.extend(pg.event.get())
+                for event in events:
+                    if event.type == pg.QUIT:
+                        self.quit()
+                        return
+                    if event.type == pg.VIDEORESIZE:
+                        resize()
+                        continue
+                    if event.type == pg.KEYUP and event.key == pg.K_F3 \
+                            and PROFILER.enabled:
+                        PROFILER.toggle_hud()
+                        continue
+                    if event.type == pg.KEYDOWN and self._change_speed(
+                            scene, event.key):
+                        continue
+                    if hasattr(event, 'pos'):
+                        event = _logical_event(event)
+                    scene.handle(event)
+                    if scene is not self.top:
+                        break
+
+            if scene is not self.top:
+                PROFILER.end_frame(0)
+                continue
+
+            steps = 0
+            if not scene.blocking:
+                with PROFILER.phase("idle"):
+                    steps = scene.scheduler.tick()
+            with PROFILER.phase("step"):
+                scene.update(steps)
+            if scene is self.top:
+                with PROFILER.phase("render"):
+                    scene.draw()
+                self._show_overlay()
+            PROFILER.end_frame(steps)
+
+    def _change_speed(self, scene: Scene, key: int) -> bool:
+        """ Change the speed if <key> is one of the speed keys and
+        return whether it was """
+        if key in FASTER_KEYS:
+            speed = self.speed * 2
+        elif key in SLOWER_KEYS:
+            speed = self.speed / 2
+        elif key in NORMAL_KEYS:
+            speed = 1.0
+        else:
+            return False
+
+        self.speed = clamp_speed(speed)
+        scene.scheduler.speed = self.speed
+        self._badge_end = pg.time.get_ticks() + SPEED_BADGE_TIME
+        return True
+
+    def _speed_badge(self) -> Optional[pg.Surface]:
+        """ Return the speed, rendered, while it is to be shown """
+        if pg.time.get_ticks() >= self._badge_end:
+            return None
+
+        if self.speed >= 1:
+            text = "Speed %gx" % self.speed
+        else:
+            text = "Speed 1/%gx" % (1 / self.speed)
+        if text != self._badge[0]:
+            label = get_text(text, get_font(), TEXT)
+            badge = pg.Surface((label.get_width() + 20,
+                                label.get_height() + 10))
+            badge.fill(BACKGROUND)
+            badge.blit(label, (10, 5))
+            self._badge = (text, badge)
+        return self._badge[1]
+
+    def _show_overlay(self) -> None:
+        """ Put the profiler HUD and the speed badge on screen, or take
+        them off, when either changed """
+        parts = tuple(part for part in (PROFILER.hud_surface(),
+                                        self._speed_badge())
+                      if part is not None)
+        if parts == self._overlay[0]:
+            return
+
+        if len(parts) > 1:
+            # One above the other
+            overlay = pg.Surface((max(part.get_width() for part in parts),
+                                  sum(part.get_height() for part in parts)),
+                                 pg.SRCALPHA)
+            y = 0
+            for part in parts:
+                overlay.blit(part, (0, y))
+                y += part.get_height()
+        else:
+            overlay = parts[0] if parts else None
+        self._overlay = (parts, overlay)
+        set_overlay(overlay)
+
+
+def _logical_event(event: pg.event.Event) -> pg.event.Event:
+    """ Return <event> with its window position mapped onto the
+    logical surface """
+    attrs = dict(event.dict)
+    attrs['pos'] = to_logical(event.pos)
+    return pg.event.Event(event.type, attrs)
@@ -0,0 +1,86 @@
+"""
+Frame pacing for Algrow's animation loops.
+
+Rendering runs at a capped frame rate while algorithms advance at their
+own step rate through a fixed-timestep accumulator, so how fast an
+algorithm plays does not depend on how fast frames are drawn.
+"""
+
+import pygame as pg
+
+# Frames per second the loops are capped at
+FPS = 60
+
+# Longest frame (milliseconds) fed to the accumulator, so a stall
+# (dragging the window, a slow frame) doesn't release a burst of steps
+MAX_FRAME_TIME = 250
+
+# Bounds of the speed multiplier: from one step every few seconds to
+# thousands of steps per frame
+MIN_SPEED = 1 / 16
+MAX_SPEED = 4096
+
+
+def clamp_speed(speed: float) -> float:
+    """ Return <speed> brought within MIN_SPEED and MAX_SPEED """
+    return min(MAX_SPEED, max(MIN_SPEED, speed))
+
+
+class Scheduler:
+    """
+    Paces a render loop at <fps> frames per second and reports how
+    many algorithm steps are due at <rate> steps per second
+
+    ==== Public Attributes ====
+    fps: The frame rate the loop is capped at
+    rate: Algorithm steps per second at normal speed
+    speed: How many times faster than <rate> steps are due
+    paused: Whether steps are held back
+    dt: How long the last frame took (milliseconds)
+
+    ==== Private Attributes ====
+    _clock: The clock that sleeps between frames
+    _acc: Simulation time (milliseconds) not yet turned into steps
+    """
+
+    fps: int
+    rate: float
+    speed: float
+    paused: bool
+    dt: int
+    _clock: pg.time.Clock
+    _acc: float
+
+    def __init__(self, rate: float, fps=FPS) -> None:
+        """ Initializes a Scheduler """
+        self.fps = fps
+        self.rate = rate
+        self.speed = 1.0
+        self.paused = False
+        self.dt = 0
+        self._clock = pg.time.Clock()
+        self._acc = 0.0
+
+    def tick(self) -> int:
+        """ Sleep until the next frame is due and return the number of
+        algorithm steps to run during it """
+        self.dt = self._clock.tick(self.fps)
+        return self.advance(self.dt)
+
+    def advance(self, dt: float) -> int:
+        """ Let <dt> milliseconds of simulation time pass without
+        sleeping, and return the number of algorithm steps due """
+        if self.paused or self.rate <= 0:
+            return 0
+
+        self._acc += min(dt, MAX_FRAME_TIME)
+        interval = 1000 / (self.rate * self.speed)
+        steps = int(self._acc // interval)
+        self._acc -= steps * interval
+        return steps
+
+    def reset(self) -> None:
+        """ Forget the simulation time built up so far, e.g. after
+        sleeping through a pause """
+        self._acc = 0.0
+        self._clock.tick()
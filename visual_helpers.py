@@ -2,11 +2,14 @@
 Dimensions, Fonts, Colours, visual helper functions,
 random helper functions for Algrow.
 
-Note: Most of the visual helpers require you to flip after using them
+Note: Most of the visual helpers require you to present() after
+using them
 """
 
+import os
 import pygame as pg
-from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 # Screen Dimensions
 HEIGHT, WIDTH = 600, 640
@@ -15,6 +18,14 @@ VISUALIZE_HEIGHT = HEIGHT - FONT_HEIGHT - 50
 
 # Text Styling and Colors
 FONT_FAMILY = "inkfree"
+FONT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         "fonts", "Lobster", "Lobster-Regular.ttf")
+
+# Font sizes used by the menus and visualisers, loaded by warm_up
+FONT_SIZES = [FONT_HEIGHT - 8, FONT_HEIGHT, 50, 60, 72]
+
+# Maximum number of rendered text surfaces kept around by write_text
+TEXT_CACHE_SIZE = 256
 
 # Custom colors
 BACKGROUND = (40, 40, 40) # Light
@@ -30,17 +41,28 @@ LIGHT_BG = (BACKGROUND[0] + 30, BACKGROUND[1] + 30, BACKGROUND[2] + 30)
 class PButton():
     """ 
     A PButton class that you can [hover] over and [click]
-    for effects
+    for effects. Its normal and hovered looks are rendered once,
+    drawing it is a single blit
     
     ==== Public Attributes ====
     coord: The coordinates of this button on the window
     color: The color of this button
     test: Optional Text on the button
+    text_size: The font size of <text>
+    hovered: Whether the cursor is on this button
+    
+    ==== Private Attributes ====
+    _normal: The button (with its outline) when not hovered
+    _hovered: The button (with its outline) when hovered
     """
     
     coord: Tuple[int]
     color: Tuple[int]
     text: Optional[str]
+    text_size: int
+    hovered: bool
+    _normal: pg.Surface
+    _hovered: pg.Surface
     
     
     def __init__(self, screen: pg.Surface, coord: Tuple[int], 
@@ -49,49 +71,78 @@ class PButton():
         self.color = color
         self.screen = screen
         self.text = ""
+        self.text_size = FONT_HEIGHT
+        self.hovered = False
+        self._render()
         self.draw()
         
         
+    @property
+    def rect(self) -> pg.Rect:
+        """The area this button covers, outline included"""
+        return pg.Rect(self.coord[0] - 3, self.coord[1] - 3, 
+                       self.coord[2] + 6, self.coord[3] + 6)
+        
+        
+    def _render(self) -> None:
+        """Pre-render the normal and hovered looks of this button"""
+        
+        hover_color = (self.color[0] - 60, self.color[1] - 60, self.color[2] - 60)
+        size = self.rect.size
+        inner = (3, 3, self.coord[2], self.coord[3])
+        # Centred by the size the text really takes, at any font size
+        font = get_font(self.text_size)
+        width, height = font.size(self.text)
+        pos = (3 + (self.coord[2] - width) // 2,
+               3 + (self.coord[3] - height) // 2)
         
-    def draw(self) -> None:
-        # [WHITE] Outline
-        out = (self.coord[0] - 3, self.coord[1] - 3, self.coord[2] + 6, 
-               self.coord[3] + 6)
-        light_bg = (BACKGROUND[0] + 30, BACKGROUND[1] + 30, BACKGROUND[2] + 30)
-        pg.draw.rect(self.screen, light_bg, out)
+        looks = []
+        for color in (self.color, hover_color):
+            # [WHITE] Outline
+            look = pg.Surface(size)
+            look.fill(LIGHT_BG)
+            
+            # Actual button
+            pg.draw.rect(look, color, inner)
+            write_text(look, self.text, font, BACKGROUND, pos)
+            looks.append(look)
+        self._normal, self._hovered = looks
         
-        # Actual button
-        pg.draw.rect(self.screen, self.color, self.coord)
-        self.add_text(self.text)
         
+    def draw(self) -> pg.Rect:
+        """Draw this button in its current state, return the area
+        drawn"""
+        
+        look = self._hovered if self.hovered else self._normal
+        return self.screen.blit(look, self.rect.topleft)
     
     
-    def is_cursor_on(self, pos: Tuple[int], clicked=False) -> bool:
+    def is_cursor_on(self, pos: Tuple[int]) -> bool:
         """Return whether <x> and <y> are within the PButton"""
         
-        ans = self.coord[0] < pos[0] < self.coord[0] + self.coord[2] and \
+        return self.coord[0] < pos[0] < self.coord[0] + self.coord[2] and \
             self.coord[1] < pos[1] < self.coord[1] + self.coord[3]
-        
-        if not clicked:
-            self.hover()
-        return ans
-        
     
-    def hover(self) -> None:
-        """Render the drawing action of PButton"""
-        
-        new_color = (self.color[0] - 60, self.color[1] - 60, self.color[2] - 60)
-        pg.draw.rect(self.screen, new_color, self.coord)
-        self.add_text(self.text)
+    
+    def update(self, pos: Tuple[int]) -> Optional[pg.Rect]:
+        """Set whether the cursor at <pos> hovers this button. Only if 
+        that changed, redraw it and return the area that needs to be
+        pushed to the display"""
         
+        hovered = self.is_cursor_on(pos)
+        if hovered == self.hovered:
+            return None
+        self.hovered = hovered
+        return self.draw()
         
-    def add_text(self, text: str) -> None:
-        """Add text to current button"""
+    
+    def add_text(self, text: str, size=FONT_HEIGHT) -> None:
+        """Add text of font <size> to current button"""
         
         self.text = text
-        pos = (self.coord[0] + (self.coord[2] // 2) - len(text) * 6.5
-               , self.coord[1] + (self.coord[3] // 2) - (FONT_HEIGHT// 2))
-        write_text(self.screen, text, get_font(), BACKGROUND, pos)
+        self.text_size = size
+        self._render()
+        self.draw()
 
 
 def draw_header(screen: pg.Surface, text: str, offset=48, thick=5) -> None:
@@ -102,16 +153,106 @@ def draw_header(screen: pg.Surface, text: str, offset=48, thick=5) -> None:
     pg.draw.rect(screen, TEXT, (offset, 70, WIDTH - (offset * 2), thick))
     
     
+# Fonts keyed by (size, bold), shared by the whole process
+_fonts: Dict[Tuple[int, bool], pg.font.Font] = {}
+
+# Rendered text surfaces keyed by (text, font, color), least recently
+# used first
+_text_surfaces: "OrderedDict[Tuple, pg.Surface]" = OrderedDict()
+
+
+# Pre-rendered static layers keyed by what they are built from
+_layers: Dict[Tuple, pg.Surface] = {}
+
+
 def get_font(size=FONT_HEIGHT, bold=False) -> pg.font:
-    """Return font of <size>"""
+    """Return font of <size>. The font file is only read the first
+    time a (<size>, <bold>) pair is asked for"""
     
-    font = pg.font.Font("fonts\Lobster\Lobster-Regular.ttf",
-                            size - 8)
-    if bold:
-        font.set_bold(True)
+    key = (size, bold)
+    font = _fonts.get(key)
+    if font is None:
+        font = pg.font.Font(FONT_PATH, size - 8)
+        if bold:
+            font.set_bold(True)
+        _fonts[key] = font
     return font
 
 
+def get_text(text: str, font: pg.font, color: Tuple) -> pg.Surface:
+    """Return <text> rendered with <font> and <color>. Surfaces are
+    kept in a bounded LRU cache so the same text is only rendered once"""
+    
+    key = (text, font, tuple(color))
+    surface = _text_surfaces.get(key)
+    if surface is not None:
+        _text_surfaces.move_to_end(key)
+        return surface
+    
+    surface = font.render(text, 1, color)
+    _text_surfaces[key] = surface
+    if len(_text_surfaces) > TEXT_CACHE_SIZE:
+        _text_surfaces.popitem(last=False)
+    return surface
+
+
+def bake_text(texts: Iterable[str], font: pg.font, 
+              colors: Iterable[Tuple]) -> None:
+    """Pre-render every text in <texts> in every color in <colors>
+    e.g. a digit atlas, so drawing them later is just a blit"""
+    
+    for color in colors:
+        for text in texts:
+            get_text(text, font, color)
+
+
+def get_layer(key: Tuple, build: Callable[[pg.Surface], None]) -> pg.Surface:
+    """Return the static layer for <key>. The first time (or after the
+    layout changes) <build> draws it on a fresh full-screen surface"""
+    
+    key = key + (WIDTH, HEIGHT)
+    layer = _layers.get(key)
+    if layer is None:
+        layer = pg.Surface((WIDTH, HEIGHT))
+        build(layer)
+        _layers[key] = layer
+    return layer
+
+
+def get_chrome(title: Optional[str] = None) -> pg.Surface:
+    """Return the layer with the background, border and (if given) 
+    the header with <title>"""
+    
+    def build(layer: pg.Surface) -> None:
+        clear_screen(layer)
+        border(layer)
+        if title is not None:
+            draw_header(layer, title)
+    
+    return get_layer(("chrome", title), build)
+
+
+def draw_chrome(screen: pg.Surface, title: Optional[str] = None) -> None:
+    """Draws the background, border and (if given) the header with 
+    <title> in one blit"""
+    
+    screen.blit(get_chrome(title), (0, 0))
+
+
+def warm_up(titles: Iterable[str]) -> Iterator[None]:
+    """Load every font in FONT_SIZES and build the chrome layers for 
+    <titles> ahead of time, one at a time, e.g. one a frame while the
+    title screen is up. Fonts and their caches are not thread-safe, so
+    this runs on the thread that draws"""
+    
+    for size in FONT_SIZES:
+        get_font(size)
+        yield
+    for title in titles:
+        get_chrome(title)
+        yield
+
+
 def border(screen: pg.Surface, color=TEXT, thick=3) -> None:
     """Draws a Border around the screen"""
     
@@ -124,23 +265,17 @@ def border(screen: pg.Surface, color=TEXT, thick=3) -> None:
 def title_screen(screen: pg.Surface) -> None:
     """Draws the title screen of the program"""
     
-    font = pg.font.SysFont(FONT_FAMILY, FONT_HEIGHT - 8)
-
-    clear_screen(screen)
-    border(screen)
+    draw_chrome(screen)
 
     write_text(screen, "Algrow", get_font(72), TEXT, (210, 210))
     pg.draw.rect(screen, TEXT, (50, 310, 540, 10))
 
-    time_loop(screen, 3000)
-
 
 def write_text(screen: pg.Surface, text: str, font: pg.font, color: Tuple,
                pos: Tuple) -> None:
     """Write the <text> on <screen> at <post> with <font> and <color>"""
     
-    text_surface = font.render(text, 1, color)
-    screen.blit(text_surface, pos)
+    screen.blit(get_text(text, font, color), pos)
     
 
 def clear_screen(screen: pg.Surface, color=BACKGROUND) -> None:
@@ -150,22 +285,5 @@ def clear_screen(screen: pg.Surface, color=BACKGROUND) -> None:
     pg.draw.rect(screen, color, (0, 0, WIDTH, HEIGHT))
     
 
-def time_loop(screen: pg.Surface, timer: int) -> None:
-    """Makes the current display on screen stay for <timer> 
-    (milliseconds) long""" 
-    
-    clock = pg.time.Clock()
-    time_elapsed = 0
-    while time_elapsed < timer:
-        
-        dt = clock.tick()
-        time_elapsed += dt
-        
-        for e in pg.event.get():
-            if e.type == pg.QUIT:
-                pg.quit()
-                exit()
-        pg.display.flip()
-        
 if __name__ == '__main__':
     pass
\ No newline at end of file
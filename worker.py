@@ -0,0 +1,203 @@
+"""
+Runs Algrow's algorithms in a worker thread.
+
+An algorithm is a generator of compact events: (kind, row, col, value)
+tuples describing what changed, e.g. a tile set to a value. The worker
+runs it ahead of the renderer, publishing one entry per algorithm step
+into a bounded ring buffer, and the renderer takes steps out at its own
+rate and applies them to what it shows. The window therefore never
+waits on the algorithm: pausing is not taking steps, a speed change is
+taking more or fewer of them and leaving stops the worker. Exports do
+wait for every step they ask for, so each frame shows the same steps
+however the threads are scheduled.
+"""
+
+import threading
+import time
+from typing import Any, Iterator, List, Optional, Tuple
+
+# Algorithm steps the worker may run ahead of the renderer, enough
+# for thousands of steps per frame
+RING_STEPS = 4096
+
+# How long (seconds) the worker sleeps when the ring buffer is full
+FULL_WAIT = 0.002
+
+# How long (seconds) take() sleeps when waiting for steps to be published
+EMPTY_WAIT = 0.001
+
+# A change published by an algorithm: (kind, row, col, value)
+Event = Tuple[int, int, int, int]
+
+
+class RingBuffer:
+    """
+    A bounded queue between one producer thread and one consumer
+    thread, without locks: only push() moves <_tail> and only pop()
+    moves <_head>, and a slot is filled before <_tail> moves past it,
+    so neither side ever touches a slot the other is still using
+
+    ==== Public Attributes ====
+    capacity: The most items the buffer holds
+
+    ==== Private Attributes ====
+    _slots: The items, in a circle
+    _head: How many items were ever popped
+    _tail: How many items were ever pushed
+    """
+
+    capacity: int
+    _slots: List[Any]
+    _head: int
+    _tail: int
+
+    def __init__(self, capacity: int) -> None:
+        """ Initializes an empty RingBuffer """
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._head = 0
+        self._tail = 0
+
+    def push(self, item: Any) -> bool:
+        """ Add <item> at the back, return False if the buffer is full """
+        if self._tail - self._head >= self.capacity:
+            return False
+        self._slots[self._tail % self.capacity] = item
+        self._tail += 1
+        return True
+
+    def pop(self) -> Any:
+        """ Remove and return the item at the front, None if empty """
+        if self._head == self._tail:
+            return None
+        index = self._head % self.capacity
+        item = self._slots[index]
+        self._slots[index] = None
+        self._head += 1
+        return item
+
+    def __len__(self) -> int:
+        """ Return the number of items in the buffer """
+        return self._tail - self._head
+
+
+class AlgorithmWorker(threading.Thread):
+    """
+    Runs an algorithm's events in the background, grouped into steps:
+    a step is every event up to and including one of kind <step>
+
+    ==== Public Attributes ====
+    steps: The steps published and not yet taken, as tuples of events
+    result: What the algorithm returned, once it is done
+    wait: Whether take() waits for every step asked for instead of
+          owing the ones not published yet
+
+    ==== Private Attributes ====
+    _events: The running algorithm
+    _step: The kind of event that ends a step
+    _finished: Whether every step has been published, or the
+               algorithm failed
+    _error: What the algorithm raised, if it failed
+    _halt: Set to make the worker give up
+    _owed: Steps the renderer asked for that weren't published yet
+    """
+
+    steps: RingBuffer
+    result: Any
+    wait: bool
+    _events: Iterator[Event]
+    _step: int
+    _finished: bool
+    _error: Optional[Exception]
+    _halt: threading.Event
+    _owed: int
+
+    def __init__(self, events: Iterator[Event], step: int,
+                 capacity=RING_STEPS) -> None:
+        """ Initializes and starts an AlgorithmWorker """
+        super().__init__(daemon=True)
+        self.steps = RingBuffer(capacity)
+        self.result = None
+        self.wait = False
+        self._events = events
+        self._step = step
+        self._finished = False
+        self._error = None
+        self._halt = threading.Event()
+        self._owed = 0
+        self.start()
+
+    def run(self) -> None:
+        group = []
+        try:
+            while True:
+                event = next(self._events)
+                group.append(event)
+                if event[0] == self._step:
+                    if not self._publish(tuple(group)):
+                        return
+                    group = []
+        except StopIteration as stop:
+            self.result = stop.value
+        except Exception as error:
+            # Raised again on the renderer's thread, after the steps
+            # before it are taken
+            self._error = error
+
+        if group and not self._publish(tuple(group)):
+            return
+        self._finished = True
+
+    def _publish(self, step: Tuple[Event, ...]) -> bool:
+        """ Push <step>, waiting while the buffer is full. Return False
+        if the worker was stopped meanwhile """
+        while not self.steps.push(step):
+            if self._halt.wait(FULL_WAIT):
+                return False
+        return not self._halt.is_set()
+
+    def take(self, count: int) -> List[Tuple[Event, ...]]:
+        """ Return the next <count> steps, fewer if the algorithm ends
+        first. Unless <wait>, also fewer if the worker hasn't published
+        them yet; those are owed and returned later (at most a buffer's
+        worth, so a slow worker doesn't build up a backlog). Raise what
+        the algorithm raised once every step before it was taken """
+        if self.wait:
+            self._owed = count
+        else:
+            self._owed = min(self._owed + count, self.steps.capacity)
+        taken = []
+        while self._owed > 0:
+            step = self.steps.pop()
+            if step is None:
+                # Checked in this order, so no step is pushed in between
+                if not self.wait or self._finished and not self.steps:
+                    break
+                time.sleep(EMPTY_WAIT)
+                continue
+            taken.append(step)
+            self._owed -= 1
+        if not taken:
+            self._ended()
+        return taken
+
+    @property
+    def done(self) -> bool:
+        """ Whether the algorithm finished and every step was taken.
+        Raise what the algorithm raised, if it failed """
+        return self._ended()
+
+    def _ended(self) -> bool:
+        """ Return whether the algorithm finished and every step was
+        taken, raising what it raised if it failed """
+        # Checked in this order, so no step is pushed in between
+        if self._finished and not self.steps:
+            if self._error is not None:
+                raise self._error
+            return True
+        return False
+
+    def stop(self) -> None:
+        """ Make the worker give up, without waiting for it """
+        self._halt.set()
+